@@ -2,9 +2,6 @@ from logging.config import fileConfig
 import os
 from dotenv import load_dotenv
 
-# Cargar variables del archivo .env
-load_dotenv()
-
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -17,25 +14,34 @@ from sqlmodel import SQLModel
 from database.models.product import Product, ProductImage, ProductVariant, Discount, Category, Branch, Brand
 from database.models.admin import Admin
 
-# Obtener la URL desde la variable de entorno
-database_url = os.getenv("DATABASE_URL") or os.getenv("POSTGRES_URL")
-if not database_url:
-    raise RuntimeError("DATABASE_URL no está definida")
-
-# Railway puede usar postgres:// pero SQLAlchemy necesita postgresql://
-if database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql://", 1)
-
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-# Sobrescribir sqlalchemy.url con la URL obtenida
-config.set_main_option("sqlalchemy.url", database_url)
+
+# Desde la app (database/connection/migrations.py) llega una conexión ya
+# abierta y el .env ya está cargado; desde la CLI se arma la URL acá.
+if config.attributes.get("connection") is None:
+    # Cargar variables del archivo .env
+    load_dotenv()
+
+    # Obtener la URL desde la variable de entorno
+    database_url = os.getenv("DATABASE_URL") or os.getenv("POSTGRES_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL no está definida")
+
+    # Railway puede usar postgres:// pero SQLAlchemy necesita postgresql://
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    # Sobrescribir sqlalchemy.url con la URL obtenida
+    config.set_main_option("sqlalchemy.url", database_url)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# Al migrar desde la app (database/connection/migrations.py) no se
+# reconfigura el logging del proceso.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -79,8 +85,19 @@ def run_migrations_online() -> None:
 
     In this scenario we need to create an Engine
     and associate a connection with the context.
+    If the caller passed a connection in config.attributes it is used as is.
 
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
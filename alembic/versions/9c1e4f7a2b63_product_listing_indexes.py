@@ -0,0 +1,35 @@
+"""product_listing_indexes
+
+Revision ID: 9c1e4f7a2b63
+Revises: 4b248d842479
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e4f7a2b63'
+down_revision: Union[str, None] = '4b248d842479'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, columnas) de los índices del listado de productos
+INDEXES = (
+    ('ix_product_retail_price_id', ['retail_price', 'id']),
+    ('ix_product_category_price_id', ['category_id', 'retail_price', 'id']),
+    ('ix_product_brand_price_id', ['brand_id', 'retail_price', 'id']),
+)
+
+
+def upgrade() -> None:
+    """Índices compuestos para filtrar por categoría/marca y ordenar por (precio, id)"""
+    for name, columns in INDEXES:
+        op.create_index(name, 'product', columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='product', if_exists=True)
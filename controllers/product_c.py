@@ -1,5 +1,8 @@
 
+from itertools import chain
+
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 # modelos de las tablas
 from database.models.product import (
@@ -7,21 +10,38 @@ from database.models.product import (
     BrandCreate, 
     CategoryCreate, 
     ProductCreate, 
+    ProductOut,
     ProductUpdate, 
     ProductVariantCreateList, 
-    ProductVariantUpdate
+    ProductVariantUpdate,
+    StockAdjustmentList,
 )
 
+from services.import_s import import_products_db
+from services.price_stats_s import get_price_stats_db
 from services.product_s import (
+    PRODUCTS_BATCH_MAX,
+    adjust_stock_batch_db,
     create_product_db,
     create_product_variant_db,
     delete_product_db,
     delete_product_variant_db,
+    fetch_products_with_cursor,
+    fetch_products_with_cursor_async,
     fetch_products_with_filters,
+    fetch_products_with_filters_async,
     get_max_min_price_db,
+    get_max_min_price_db_async,
+    get_product_facets_db,
+    get_product_facets_db_async,
+    resolve_product_filters,
+    resolve_product_filters_async,
     get_product_by_id_db,
+    get_product_by_id_db_async,
+    get_product_by_serial_db,
+    get_products_batch_db,
     get_product_variants_by_product_id_db,
-    get_products_all_db,
+    iter_products_all_db,
     update_product_db,
     update_product_variant_db,
     upsert_product_variant_db
@@ -43,26 +63,89 @@ def create_product(product: ProductCreate, session: Session):
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error interno del servidor al crear producto")
 
-def get_products_all(session: Session):
+def stream_products_all(output_format: str = "json"):
+    """Transmite el catálogo completo como arreglo JSON o NDJSON.
+
+    El primer bloque se lee antes de responder para que un error de base de
+    datos se convierta en un 500 en lugar de cortar la respuesta a la mitad.
+    """
+    chunks = iter_products_all_db()
     try:
-        return get_products_all_db(session)
-    except Exception as e:
+        first = next(chunks, [])
+    except Exception:
         raise HTTPException(status_code=500, detail="Error al obtener productos")
 
+    def serialize(chunk):
+        return [ProductOut.model_validate(p).model_dump_json().encode("utf-8") for p in chunk]
+
+    def ndjson():
+        for chunk in chain([first], chunks):
+            yield b"".join(line + b"\n" for line in serialize(chunk))
+
+    def json_array():
+        yield b"["
+        separator = b""
+        for chunk in chain([first], chunks):
+            items = serialize(chunk)
+            if items:
+                yield separator + b",".join(items)
+                separator = b","
+        yield b"]"
+
+    if output_format == "ndjson":
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    return StreamingResponse(json_array(), media_type="application/json")
+
+
+def parse_facets(facets: str | None) -> tuple[str, ...]:
+    """"categories,brands" -> ("categories", "brands"), sin repetidos"""
+    if not facets:
+        return ()
+    return tuple(dict.fromkeys(name.strip() for name in facets.split(",")))
 
 def get_filtered_paginated_products_controller(
-    session: Session, page: int, size: int, filters: dict
+    session: Session, page: int, size: int, filters: dict, total_mode: str = "exact",
+    facets: str | None = None,
 ):
     """Obtiene productos filtrados y paginados."""
-    products, total_count = fetch_products_with_filters(session, page, size, filters)
+    filters = resolve_product_filters(session, filters)
+    products, total_count, total_mode = fetch_products_with_filters(
+        session, page, size, filters, total_mode
+    )
+    facet_names = parse_facets(facets)
     return {
         "products": products,
         "total": total_count,
         "page": page,
         "size": size,
         "pages": (total_count + size - 1) // size,
+        "total_mode": total_mode,
+        "facets": get_product_facets_db(session, filters, facet_names) if facet_names else None,
     }
 
+def get_cursor_paginated_products_controller(
+    session: Session, size: int, filters: dict, cursor: str | None, facets: str | None = None
+):
+    """Obtiene productos filtrados paginados por cursor."""
+    filters = resolve_product_filters(session, filters)
+    try:
+        products, next_cursor = fetch_products_with_cursor(session, size, filters, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    facet_names = parse_facets(facets)
+    return {
+        "products": products,
+        "size": size,
+        "next_cursor": next_cursor,
+        "facets": get_product_facets_db(session, filters, facet_names) if facet_names else None,
+    }
+
+def get_price_stats(session: Session, filters: dict, buckets: int):
+    try:
+        return get_price_stats_db(session, resolve_product_filters(session, filters), buckets)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener estadísticas de precios")
+
 def get_min_max_price(session: Session):
     try:
         max_price, min_price = get_max_min_price_db(session)
@@ -79,6 +162,84 @@ def get_products_by_id(product_id: int, session: Session):
     except Exception as e:
         raise HTTPException(status_code=500, detail="Error al obtener producto")
     
+# Versiones async de las lecturas del catálogo (ASYNC_DB=1, routers/product_async_r.py)
+async def get_filtered_paginated_products_controller_async(
+    session, page: int, size: int, filters: dict, total_mode: str = "exact",
+    facets: str | None = None,
+):
+    filters = await resolve_product_filters_async(session, filters)
+    products, total_count, total_mode = await fetch_products_with_filters_async(
+        session, page, size, filters, total_mode
+    )
+    facet_names = parse_facets(facets)
+    return {
+        "products": products,
+        "total": total_count,
+        "page": page,
+        "size": size,
+        "pages": (total_count + size - 1) // size,
+        "total_mode": total_mode,
+        "facets": await get_product_facets_db_async(session, filters, facet_names) if facet_names else None,
+    }
+
+async def get_cursor_paginated_products_controller_async(
+    session, size: int, filters: dict, cursor: str | None, facets: str | None = None
+):
+    filters = await resolve_product_filters_async(session, filters)
+    try:
+        products, next_cursor = await fetch_products_with_cursor_async(session, size, filters, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    facet_names = parse_facets(facets)
+    return {
+        "products": products,
+        "size": size,
+        "next_cursor": next_cursor,
+        "facets": await get_product_facets_db_async(session, filters, facet_names) if facet_names else None,
+    }
+
+async def get_min_max_price_async(session):
+    try:
+        max_price, min_price = await get_max_min_price_db_async(session)
+        return {"max": str(max_price), "min": str(min_price)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener rango de precios")
+
+async def get_products_by_id_async(product_id: int, session):
+    try:
+        return await get_product_by_id_db_async(session, product_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener producto")
+
+
+def get_product_by_serial(serial_number: str, session: Session):
+    try:
+        return get_product_by_serial_db(session, serial_number)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener producto")
+
+
+def get_products_batch(ids: str | None, serials: str | None, session: Session):
+    """Obtiene varios productos a partir de listas separadas por coma"""
+    try:
+        id_list = [int(value) for value in (ids or "").split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por coma")
+    serial_list = [value.strip() for value in (serials or "").split(",") if value.strip()]
+    if len(id_list) + len(serial_list) > PRODUCTS_BATCH_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"Se pueden pedir hasta {PRODUCTS_BATCH_MAX} productos por consulta"
+        )
+    try:
+        return get_products_batch_db(session, id_list, serial_list)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al obtener productos")
+
+
 def update_product(product_id: int, product: ProductUpdate, session: Session):
     try:
         product_variants = update_product_db(product_id, product, session)
@@ -115,6 +276,29 @@ def upsert_product_variant(variant: ProductVariantCreateList, session: Session):
         raise HTTPException(status_code=500, detail=f"Error en upsert de variantes: {str(e)}")
 
 
+def adjust_stock_batch(stock: StockAdjustmentList, session: Session):
+    """Ajusta el stock de varias variantes de forma atómica (todo o nada)"""
+    try:
+        result = adjust_stock_batch_db(
+            [(item.variant_id, item.delta) for item in stock.adjustments], session
+        )
+        return [{"variant_id": variant_id, "stock": value} for variant_id, value in result.items()]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al ajustar stock")
+
+
+async def import_products(byte_chunks, file_format: str, session: Session):
+    """Importa productos y variantes desde un cuerpo CSV o JSONL transmitido"""
+    try:
+        return await import_products_db(byte_chunks, file_format, session)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al importar productos")
+
+
 def get_product_variants_by_product_id(product_id: int, session: Session):
     try:
         return get_product_variants_by_product_id_db(product_id, session)
@@ -1,10 +1,15 @@
 
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
 from typing import Annotated
 from fastapi import Depends
 import os
+import time
 from dotenv import load_dotenv
 
+from database.connection.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_options
+
 load_dotenv()
 
 # Obtener la URL de la base de datos desde variables de entorno
@@ -18,15 +23,90 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Configuración del engine para PostgreSQL
-# Nota: "check_same_thread" es solo para SQLite, no se usa con PostgreSQL
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,  # Cambiar a True para ver las queries SQL en desarrollo
-    pool_pre_ping=True,  # Verifica la conexión antes de usarla
-    pool_size=5,  # Tamaño del pool de conexiones
-    max_overflow=10,  # Conexiones adicionales permitidas
-)
+# Engine async opcional (ASYNC_DB=1): las lecturas del catálogo corren en el
+# event loop en lugar del threadpool. Requiere asyncpg (o aiosqlite en SQLite)
+ASYNC_DB = os.getenv("ASYNC_DB", "0") == "1"
+
+# Con ASYNC_DB cada worker tiene dos pools que comparten el presupuesto de conexiones
+ENGINES_PER_WORKER = 2 if ASYNC_DB else 1
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Cambia el driver de la URL por su equivalente async"""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"ASYNC_DB no soporta el motor '{backend}'")
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+
+def create_engines(url: str):
+    """Crea el engine sync y, con ASYNC_DB=1, el async para una misma base"""
+    # Nota: "check_same_thread" es solo para SQLite, no se usa con PostgreSQL
+    # Pool configurable por variables DB_POOL_* (ver database/connection/pool.py)
+    sync_engine = create_engine(
+        url,
+        echo=False,  # Cambiar a True para ver las queries SQL en desarrollo
+        poolclass=InstrumentedQueuePool,
+        **pool_options(ENGINES_PER_WORKER),
+    )
+    if not ASYNC_DB:
+        return sync_engine, None
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    try:
+        return sync_engine, create_async_engine(
+            to_async_url(url),
+            echo=False,
+            poolclass=InstrumentedAsyncQueuePool,
+            **pool_options(ENGINES_PER_WORKER),
+        )
+    except ModuleNotFoundError as e:
+        raise RuntimeError(f"ASYNC_DB=1 requiere el driver async: pip install {e.name}")
+
+
+# Configuración del engine para PostgreSQL (primario: escrituras y admin)
+engine, async_engine = create_engines(DATABASE_URL)
+
+# Réplica de lectura opcional para los GET públicos del catálogo
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+
+if DATABASE_READ_URL:
+    read_engine, async_read_engine = create_engines(DATABASE_READ_URL)
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+# Tras una escritura las lecturas van al primario durante esta ventana, para
+# no devolver datos que la réplica todavía no recibió
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "2"))
+_last_write = float("-inf")
+
+
+def mark_primary_write():
+    """Registra una escritura (local o avisada por otro worker)"""
+    global _last_write
+    _last_write = time.monotonic()
+
+
+def reads_pinned_to_primary() -> bool:
+    return time.monotonic() - _last_write < READ_AFTER_WRITE_SECONDS
+
+
+def current_read_engine():
+    """Engine para lecturas públicas: la réplica, salvo justo después de escribir"""
+    return engine if reads_pinned_to_primary() else read_engine
+
+
+if read_engine is not engine:
+    event.listen(engine, "commit", lambda conn: mark_primary_write())
 
 
 def create_db_and_tables():
@@ -50,5 +130,20 @@ def get_session():
         yield session
 
 
+def get_read_session():
+    """Sesión de solo lectura (réplica si DATABASE_READ_URL está definida)."""
+    with Session(current_read_engine()) as session:
+        yield session
+
+
+async def get_async_session():
+    """Generador de sesiones async de lectura (solo con ASYNC_DB=1)."""
+    bind = async_engine if reads_pinned_to_primary() else async_read_engine
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
+
+
 # Tipo anotado para usar como dependencia en FastAPI
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_session)]
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Migraciones de Alembic al arrancar, dentro del proceso
+
+Compara la revisión guardada en alembic_version con el head de los scripts y
+solo ejecuta `upgrade head` si difieren. En PostgreSQL un advisory lock hace
+que, con varios workers arrancando a la vez, migre uno solo; los demás
+esperan el lock y al volver a comparar ya encuentran la base al día.
+Reemplaza al `alembic upgrade head` en un subproceso por cada worker.
+
+Si la base ya tiene una revisión que estos scripts no conocen (un rollback o
+un deploy gradual con la imagen anterior) no se migra: se avisa y se arranca
+igual, y /health/ready informa la base como "ahead".
+"""
+import logging
+from pathlib import Path
+
+from sqlalchemy import text
+
+# Alembic se importa dentro de las funciones: importarlo cuesta ~200 ms y
+# solo hace falta con PostgreSQL, o cuando la base no está al día.
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+# Clave del advisory lock de PostgreSQL que serializa las migraciones
+MIGRATION_LOCK_ID = 72460193
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationError(Exception):
+    """Error de Alembic al migrar (revisión inexistente, script inválido, etc.)"""
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    # env.py usa esta conexión en lugar de crear un engine y no toca el logging
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def script_revisions(config) -> tuple[set[str], set[str]]:
+    """(heads, todas las revisiones conocidas) de los scripts de migración"""
+    from alembic.script import ScriptDirectory
+
+    scripts = ScriptDirectory.from_config(config)
+    return set(scripts.get_heads()), {script.revision for script in scripts.walk_revisions()}
+
+
+def database_heads(connection) -> set[str]:
+    from alembic.runtime.migration import MigrationContext
+
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def upgrade_to_head(engine) -> bool:
+    """Aplica las migraciones pendientes; retorna True si hubo que migrar.
+
+    Las migraciones usan SQL de PostgreSQL; con otras bases las tablas las
+    crea create_db_and_tables. Los errores de Alembic se levantan como
+    MigrationError.
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    from alembic import command
+    from alembic.script.revision import RevisionError
+    from alembic.util.exc import CommandError
+
+    heads, known = script_revisions(alembic_config())
+
+    def up_to_date(connection) -> bool:
+        current = database_heads(connection)
+        if current - known:
+            # La base la migró una versión más nueva de la app: no tocarla
+            logger.warning("La base está en revisiones desconocidas %s; no se migra", sorted(current - known))
+            return True
+        return current == heads
+
+    with engine.connect() as connection:
+        if up_to_date(connection):
+            return False
+
+    try:
+        with engine.begin() as connection:
+            # Se libera solo al terminar la transacción
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            if up_to_date(connection):
+                return False
+            command.upgrade(alembic_config(connection), "head")
+    except (CommandError, RevisionError) as e:
+        raise MigrationError(str(e)) from e
+    return True
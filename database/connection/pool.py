@@ -0,0 +1,114 @@
+"""
+Configuración e instrumentación del pool de conexiones
+
+El tamaño del pool sale de un presupuesto global de conexiones
+(DB_MAX_CONNECTIONS) repartido entre los workers (WEB_CONCURRENCY) y entre
+los engines de cada worker; DB_POOL_SIZE / DB_MAX_OVERFLOW lo fijan a mano.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Conexiones reservadas fuera de los pools (listener LISTEN/NOTIFY, migraciones)
+RESERVED_CONNECTIONS = 1
+# Valores por defecto (los de SQLAlchemy): pool 5 + overflow 10
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+
+
+def pool_sizing(engines_per_worker: int = 1) -> tuple[int, int]:
+    """Retorna (pool_size, max_overflow) para cada engine de este worker.
+
+    Variables: DB_POOL_SIZE / DB_MAX_OVERFLOW (fijos) o DB_MAX_CONNECTIONS
+    (presupuesto total, 0 = sin presupuesto) y WEB_CONCURRENCY (workers).
+    Si solo se fija una de DB_POOL_SIZE / DB_MAX_OVERFLOW, la otra conserva
+    su valor por defecto.
+    """
+    pool_size, max_overflow = os.getenv("DB_POOL_SIZE"), os.getenv("DB_MAX_OVERFLOW")
+    if pool_size is not None or max_overflow is not None:
+        return int(pool_size or DEFAULT_POOL_SIZE), int(max_overflow or DEFAULT_MAX_OVERFLOW)
+
+    budget = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    if budget <= 0:
+        return DEFAULT_POOL_SIZE, DEFAULT_MAX_OVERFLOW
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    per_engine = (budget // workers - RESERVED_CONNECTIONS) // engines_per_worker
+    if per_engine < 1:
+        raise RuntimeError(f"DB_MAX_CONNECTIONS={budget} no alcanza para {workers} workers")
+    # Dos tercios fijos y el resto como overflow para picos
+    pool_size = max(1, per_engine * 2 // 3)
+    return pool_size, per_engine - pool_size
+
+
+def pool_options(engines_per_worker: int = 1) -> dict:
+    """Argumentos de create_engine / create_async_engine para el pool"""
+    pool_size, max_overflow = pool_sizing(engines_per_worker)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),  # segundos; -1 = nunca
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+        "pool_use_lifo": os.getenv("DB_POOL_USE_LIFO", "0") == "1",
+    }
+
+
+class PoolMetricsMixin:
+    """Mide cuánto se espera para obtener una conexión y cuántas veces se agota el tiempo"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return connection
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            checkouts = self.checkouts
+            return {
+                "pool_size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "max_overflow": self._max_overflow,
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_seconds_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(PoolMetricsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_metrics(engine) -> dict | None:
+    """Métricas del pool de un engine (sync o async) o None si no está instrumentado"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    if not isinstance(pool, PoolMetricsMixin):
+        return None
+    return pool.metrics()
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, field_validator
-from sqlalchemy import CheckConstraint
+from pydantic import BaseModel, field_validator, model_validator
+from sqlalchemy import CheckConstraint, Index
 from sqlmodel import Field, SQLModel, Relationship, Enum as Eenum, UniqueConstraint
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -105,6 +105,10 @@ class Product(SQLModel, table=True):
         UniqueConstraint("name", "category_id", "brand_id", name="unique_product_per_category_brand"),
         CheckConstraint("cost >= 0", name="check_cost_positive"),
         CheckConstraint("retail_price >= 0", name="check_retail_price_positive"),
+        # Listado: filtros por FK y orden/rango por (retail_price, id)
+        Index("ix_product_retail_price_id", "retail_price", "id"),
+        Index("ix_product_category_price_id", "category_id", "retail_price", "id"),
+        Index("ix_product_brand_price_id", "brand_id", "retail_price", "id"),
     )
     
     id: int | None = Field(default=None, primary_key=True)
@@ -293,6 +297,15 @@ class ProductVariantUpdate(BaseModel):
         return v
 
 
+class StockAdjustment(BaseModel):
+    variant_id: int
+    delta: int  # positivo suma stock, negativo lo descuenta
+
+
+class StockAdjustmentList(BaseModel):
+    adjustments: List[StockAdjustment]
+
+
 class ProductImageOut(BaseModel):
     id: int
     variant_id: int
@@ -466,6 +479,13 @@ class ProductOutSimple(BaseModel):
         from_attributes = True
 
 
+class FacetCount(BaseModel):
+    """Cantidad de productos de una categoría o marca para los filtros actuales"""
+    id: int
+    name: str
+    count: int
+
+
 class ProductOutPaginated(BaseModel):
     """Respuesta paginada de productos"""
     products: List[ProductOutSimple]
@@ -473,3 +493,115 @@ class ProductOutPaginated(BaseModel):
     page: int
     size: int
     pages: int
+    # "exact" o "estimate": indica si total y pages son exactos o estimados
+    total_mode: str = "exact"
+    # Solo con ?facets=: {"categories": [...], "brands": [...]}
+    facets: Dict[str, List[FacetCount]] | None = None
+
+
+class PriceBucket(BaseModel):
+    """Rango de precios del histograma; el último incluye el máximo"""
+    min: float
+    max: float
+    count: int
+
+
+class PriceStats(BaseModel):
+    """Estadísticas de precio de los productos que cumplen los filtros"""
+    min: float | None = None
+    max: float | None = None
+    count: int = 0
+    buckets: List[PriceBucket] = []
+
+
+class ProductOutCursorPage(BaseModel):
+    """Respuesta paginada por cursor (keyset) de productos"""
+    products: List[ProductOutSimple]
+    size: int
+    next_cursor: str | None = None
+    facets: Dict[str, List[FacetCount]] | None = None
+
+
+# =============================================
+# SCHEMAS PYDANTIC - IMPORTACIÓN MASIVA
+# =============================================
+
+class ProductImportRow(BaseModel):
+    """Fila de importación: producto y, si trae sucursal, una variante.
+
+    Categoría, marca y sucursal se indican por nombre y se crean si no existen.
+    Varias filas con el mismo serial_number agregan variantes al mismo producto.
+    """
+    serial_number: str
+    name: str
+    description: str | None = None
+    category: str | None = None
+    brand: str | None = None
+    warranty_time: int | None = None
+    warranty_unit: WarrantyUnit | None = None
+    cost: float
+    retail_price: float
+    status: ProductStatus = ProductStatus.ACTIVE
+    # Variante (opcional)
+    branch: str | None = None
+    color: str | None = None
+    size: str | None = None
+    size_unit: str | None = None
+    unit: str | None = None
+    stock: int = 0
+    min_stock: int = 5
+    images: list[str] | None = None
+
+    @field_validator(
+        'description', 'category', 'brand', 'warranty_time', 'warranty_unit', 'branch',
+        'color', 'size', 'size_unit', 'unit', mode='before'
+    )
+    @classmethod
+    def empty_to_none(cls, v):
+        """En CSV las celdas vacías llegan como ''"""
+        if v == '':
+            return None
+        return v
+
+    @model_validator(mode='before')
+    @classmethod
+    def empty_to_default(cls, data):
+        """Celdas vacías en campos con valor por defecto: como si no vinieran.
+
+        Usan el default y quedan fuera de model_fields_set, así al reimportar
+        un serial existente no se pisa su estado.
+        """
+        if isinstance(data, dict):
+            data = {
+                key: value for key, value in data.items()
+                if not (key in ('status', 'stock', 'min_stock') and value in ('', None))
+            }
+        return data
+
+    @field_validator('images', mode='before')
+    @classmethod
+    def split_images(cls, v):
+        """Acepta lista (JSONL) o URLs separadas por '|' (CSV)"""
+        if isinstance(v, str):
+            v = v.split('|')
+        if isinstance(v, list):
+            v = [url.strip() for url in v if url and url.strip()]
+        return v or None
+
+
+class ProductImportRowResult(BaseModel):
+    line: int
+    serial_number: str | None = None
+    status: str  # "created", "updated" o "error"
+    product_id: int | None = None
+    variant_id: int | None = None
+    error: str | None = None
+
+
+class ProductImportReport(BaseModel):
+    """Resultado de la importación, con una entrada por fila"""
+    total: int
+    created: int
+    updated: int
+    errors: int
+    rows: List[ProductImportRowResult]
@@ -1,14 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import os
+from sqlalchemy.exc import SQLAlchemyError
 
 from routers import product_r, branches_r, categories_r, brands_r, admin_r
-from database.connection.SQLConection import create_db_and_tables
+from database.connection.SQLConection import ASYNC_DB, async_engine, async_read_engine, create_db_and_tables, engine
+from database.connection.migrations import MigrationError, upgrade_to_head
+from services.health_s import readiness, start_health_probe, stop_health_probe
+from services.http_cache_s import HTTP_RESPONSE_CACHE, HTTP_SINGLE_FLIGHT, ResponseCacheMiddleware
+from services.invalidation_s import start_invalidation_listener, stop_invalidation_listener
 # Importar modelo Admin para que SQLModel lo registre
 from database.models.admin import Admin  # noqa: F401
-import subprocess
-from pathlib import Path
 
 
 @asynccontextmanager
@@ -17,16 +21,23 @@ async def lifespan(app: FastAPI):
     # Skip migrations if already run by docker-entrypoint.py
     if os.getenv("ALEMBIC_RUN") != "1":
         try:
-            cwd = Path(__file__).parent
-            result = subprocess.run(["alembic", "upgrade", "head"], cwd=cwd, capture_output=True, text=True)
-            if result.returncode == 0:
+            if upgrade_to_head(engine):
                 print("✅ Migraciones aplicadas")
-        except Exception:
-            pass
+        except (SQLAlchemyError, MigrationError) as e:
+            # Base caída o migración fallida: se arranca igual y /health/ready lo refleja
+            print(f"⚠️ No se pudieron aplicar las migraciones: {e}")
 
     create_db_and_tables()
+    # Escucha invalidaciones de caché publicadas por otros workers/réplicas
+    start_invalidation_listener()
+    # Sonda de la base en segundo plano para /health y /health/ready
+    start_health_probe()
     print("🚀 Backend listo")
     yield
+    stop_health_probe()
+    stop_invalidation_listener()
+    for async_db_engine in {async_engine, async_read_engine} - {None}:
+        await async_db_engine.dispose()
 
 
 app = FastAPI(
@@ -44,6 +55,10 @@ if allowed_origins == "*":
 else:
     origins = [origin.strip() for origin in allowed_origins.split(",")]
 
+# Caché y single-flight de las lecturas públicas; se registra antes que CORS
+# para que las respuestas cacheadas también lleven sus cabeceras
+if HTTP_RESPONSE_CACHE or HTTP_SINGLE_FLIGHT:
+    app.add_middleware(ResponseCacheMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -53,6 +68,10 @@ app.add_middleware(
 )
 
 # Rutas principales para el catálogo de productos
+if ASYNC_DB:
+    # Lecturas públicas en el event loop; deben registrarse antes que product_r
+    from routers import product_async_r
+    app.include_router(product_async_r.router, tags=["Products"], prefix="/products")
 app.include_router(product_r.router, tags=["Products"], prefix="/products")
 app.include_router(branches_r.router, tags=["Branches"], prefix="/branches")
 app.include_router(categories_r.router, tags=["Categories"], prefix="/categories")
@@ -68,23 +87,26 @@ def read_root():
 
 
 @app.get("/health")
-def health_check():
-    """Health check endpoint para Railway."""
-    from database.connection.SQLConection import engine as db_engine
-    from sqlalchemy import text
-    
-    try:
-        with db_engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        from fastapi import Response
-        return Response(
-            content='{"status":"unhealthy","database":"disconnected"}',
-            status_code=503,
-            media_type="application/json"
-        )
+async def health_check():
+    """Health check endpoint para Railway (resultado de la última sonda, sin consultar la base)."""
+    ready, detail = readiness()
+    return JSONResponse(
+        {"status": "healthy" if ready else "unhealthy", "database": detail["database"]},
+        status_code=200 if ready else 503,
+    )
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """El proceso responde; no consulta la base."""
+    return {"status": "alive"}
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Listo para recibir tráfico: base conectada, migraciones al día y sonda reciente.
+
+    Incluye el uso del pool de conexiones. Responde 503 si no está listo.
+    """
+    ready, detail = readiness()
+    return JSONResponse(detail, status_code=200 if ready else 503)
@@ -2,23 +2,35 @@ from datetime import timedelta
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
-from database.connection.SQLConection import get_session
+from database.connection.SQLConection import async_engine, async_read_engine, engine, get_session, read_engine
+from database.connection.pool import pool_metrics
 from database.models.admin import (
     Admin, AdminCreate, AdminLogin, AdminOut, AdminUpdate, 
     PasswordChange, Token, AdminRole
 )
 from services.auth_s import (
     authenticate_admin, create_access_token, get_password_hash,
-    get_admin_by_username, ACCESS_TOKEN_EXPIRE_MINUTES,
+    find_admin_conflict, ACCESS_TOKEN_EXPIRE_MINUTES,
     RequireAdmin, RequireSuperAdmin, RequireAdminOrHigher,
     verify_password
 )
+from services.cache_s import invalidate
+from services.ratelimit_s import check_login_identifier, check_login_ip, client_ip, reset_login_identifier
 
 router = APIRouter()
 
 
+def too_many_attempts(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Demasiados intentos de login, intente más tarde",
+        headers={"Retry-After": str(max(1, round(retry_after)))},
+    )
+
+
 @router.post("/login", response_model=Token)
 async def login(
     request: Request,
@@ -32,7 +44,17 @@ async def login(
     Body:
     - identifier: username o email
     - password: contraseña
+
+    Los intentos se limitan por IP y por identificador (429 con Retry-After).
     """
+    ip = client_ip(
+        request.client.host if request.client else None,
+        ",".join(request.headers.getlist("x-forwarded-for")),
+    )
+    retry_after = check_login_ip(ip)
+    if retry_after:
+        raise too_many_attempts(retry_after)
+
     # Accept either JSON body with {'identifier', 'password'} or
     # form-encoded OAuth2 fields (username, password) that Swagger's OAuth UI uses.
     identifier = None
@@ -53,7 +75,11 @@ async def login(
     if not identifier or not password:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="identifier/username and password are required")
 
-    admin = authenticate_admin(session, identifier, password)
+    retry_after = check_login_identifier(identifier)
+    if retry_after:
+        raise too_many_attempts(retry_after)
+
+    admin = await authenticate_admin(session, identifier, password)
     if not admin:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,6 +87,7 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    reset_login_identifier(identifier)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": admin.username, "role": admin.role.value},
@@ -79,23 +106,15 @@ def register_admin(
     Registra un nuevo administrador.
     Solo accesible por SUPER_ADMIN.
     """
-    # Verificar si el username ya existe
-    existing = get_admin_by_username(session, admin_data.username)
-    if existing:
+    # Verificar username y email en una sola consulta
+    conflict = find_admin_conflict(session, admin_data.username, admin_data.email)
+    if conflict:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El nombre de usuario ya está en uso"
+            detail=conflict
         )
     
-    # Verificar si el email ya existe
-    stmt = select(Admin).where(Admin.email == admin_data.email)
-    if session.exec(stmt).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El email ya está en uso"
-        )
-    
-    # Crear el admin
+    # Crear el admin; las restricciones únicas cubren los registros simultáneos
     new_admin = Admin(
         username=admin_data.username,
         email=admin_data.email,
@@ -103,8 +122,16 @@ def register_admin(
         role=admin_data.role
     )
     session.add(new_admin)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El nombre de usuario o el email ya están en uso"
+        )
     session.refresh(new_admin)
+    invalidate("admin", new_admin.id)
     
     return new_admin
 
@@ -137,6 +164,7 @@ def setup_first_admin(
     session.add(first_admin)
     session.commit()
     session.refresh(first_admin)
+    invalidate("admin", first_admin.id)
     
     return first_admin
 
@@ -158,19 +186,42 @@ def change_password(
     """
     Cambia la contraseña del admin autenticado.
     """
-    if not verify_password(password_data.current_password, current_admin.hashed_password):
+    # current_admin viene de la caché y no trae el hash; cargar el registro
+    admin = session.get(Admin, current_admin.id)
+    if not verify_password(password_data.current_password, admin.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
         )
     
-    current_admin.hashed_password = get_password_hash(password_data.new_password)
-    session.add(current_admin)
+    admin.hashed_password = get_password_hash(password_data.new_password)
+    session.add(admin)
     session.commit()
+    invalidate("admin", admin.id)
     
     return {"msg": "Contraseña actualizada correctamente"}
 
 
+@router.get("/metrics/pool")
+def get_pool_metrics(current_admin: RequireAdminOrHigher):
+    """
+    Métricas del pool de conexiones de este worker.
+    Solo accesible por ADMIN o SUPER_ADMIN.
+
+    checked_out/overflow son el estado actual; checkouts, timeouts y
+    wait_ms_* se acumulan desde que arrancó el proceso.
+    """
+    metrics = {
+        "sync": pool_metrics(engine),
+        "async": pool_metrics(async_engine) if async_engine is not None else None,
+    }
+    # Réplica de lectura (DATABASE_READ_URL)
+    if read_engine is not engine:
+        metrics["read"] = pool_metrics(read_engine)
+        metrics["async_read"] = pool_metrics(async_read_engine) if async_read_engine is not None else None
+    return metrics
+
+
 @router.get("/list", response_model=list[AdminOut])
 def list_admins(
     current_admin: RequireSuperAdmin,
@@ -203,7 +254,13 @@ def update_admin(
             detail="Admin no encontrado"
         )
     
-    if admin_data.email:
+    if admin_data.email and admin_data.email != admin.email:
+        conflict = find_admin_conflict(session, None, admin_data.email, exclude_id=admin_id)
+        if conflict:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=conflict
+            )
         admin.email = admin_data.email
     if admin_data.role:
         admin.role = admin_data.role
@@ -211,8 +268,16 @@ def update_admin(
         admin.is_active = admin_data.is_active
     
     session.add(admin)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email ya está en uso"
+        )
     session.refresh(admin)
+    invalidate("admin", admin_id)
     
     return admin
 
@@ -243,5 +308,6 @@ def delete_admin(
     
     session.delete(admin)
     session.commit()
+    invalidate("admin", admin_id)
     
     return {"msg": "Admin eliminado correctamente"}
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from typing import List
 from controllers.product_c import create_branch, delete_branch, get_branches, update_branch
-from database.connection.SQLConection import SessionDep
+from database.connection.SQLConection import ReadSessionDep, SessionDep
 from database.models.product import BranchCreate, BranchOut
 from services.auth_s import RequireEditorOrHigher, RequireAdminOrHigher
 
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("/get/all")
 def get_branch_endp(
-    session: SessionDep = SessionDep
+    session: ReadSessionDep = ReadSessionDep
 ) -> List[BranchOut]:
     """Obtener todas las sucursales - PÚBLICO"""
     return get_branches(session)
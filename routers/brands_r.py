@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from typing import List
 from controllers.product_c import create_brand, delete_brand, get_brands, update_brand
-from database.connection.SQLConection import SessionDep
+from database.connection.SQLConection import ReadSessionDep, SessionDep
 from database.models.product import BrandCreate, BrandOut
 from services.auth_s import RequireEditorOrHigher, RequireAdminOrHigher
 
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("/get/all")
 def get_brand_endp(
-    session: SessionDep = SessionDep
+    session: ReadSessionDep = ReadSessionDep
 ) -> List[BrandOut]:
     """Obtener todas las marcas - PÚBLICO"""
     return get_brands(session)
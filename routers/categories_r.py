@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from typing import List
 from controllers.product_c import create_category, delete_category, get_categories, update_category
-from database.connection.SQLConection import SessionDep
+from database.connection.SQLConection import ReadSessionDep, SessionDep
 from database.models.product import CategoryCreate, CategoryOut
 from services.auth_s import RequireEditorOrHigher, RequireAdminOrHigher
 
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("/get/all")
 def get_category_endp(
-    session: SessionDep = SessionDep
+    session: ReadSessionDep = ReadSessionDep
 ) -> List[CategoryOut]:
     """Obtener todas las categorías - PÚBLICO"""
     return get_categories(session)
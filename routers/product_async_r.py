@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from database.connection.SQLConection import AsyncSessionDep
+from database.models.product import ProductOut, ProductOutCursorPage, ProductOutPaginated
+from controllers.product_c import (
+    get_cursor_paginated_products_controller_async,
+    get_filtered_paginated_products_controller_async,
+    get_min_max_price_async,
+    get_products_by_id_async,
+)
+from services.product_s import PRODUCT_FACETS_PATTERN, PRODUCT_IDS_PATTERN
+
+# Lecturas públicas del catálogo sobre el engine async. main.py incluye este
+# router antes que product_r solo con ASYNC_DB=1, así que estas rutas toman
+# precedencia; la documentación OpenAPI sigue saliendo de product_r.
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/get/{product_id}")
+async def get_product_by_id_endp(
+    product_id: int,
+    session: AsyncSessionDep,
+) -> ProductOut:
+    """Obtener producto por ID - PÚBLICO"""
+    return await get_products_by_id_async(product_id, session)
+
+
+@router.get("/")
+async def get_filtered_paginated_products(
+    session: AsyncSessionDep,
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
+    categories: Optional[str] = Query(None),
+    brands: Optional[str] = Query(None),
+    category_ids: Optional[str] = Query(None, pattern=PRODUCT_IDS_PATTERN),
+    brand_ids: Optional[str] = Query(None, pattern=PRODUCT_IDS_PATTERN),
+    minPrice: Optional[float] = Query(None, ge=0),
+    maxPrice: Optional[float] = Query(None, ge=0),
+    pagination: str = Query("page", pattern="^(page|cursor)$"),
+    cursor: Optional[str] = Query(None),
+    total_mode: str = Query("exact", pattern="^(exact|estimate)$"),
+    facets: Optional[str] = Query(None, pattern=PRODUCT_FACETS_PATTERN),
+) -> ProductOutPaginated | ProductOutCursorPage:
+    """Obtener productos paginados con filtros - PÚBLICO"""
+    filters = {
+        "categories": categories,
+        "brands": brands,
+        "category_ids": category_ids,
+        "brand_ids": brand_ids,
+        "min_price": minPrice,
+        "max_price": maxPrice,
+    }
+    if pagination == "cursor" or cursor:
+        return await get_cursor_paginated_products_controller_async(session, size, filters, cursor, facets)
+    return await get_filtered_paginated_products_controller_async(session, page, size, filters, total_mode, facets)
+
+
+@router.get("/min-max-price")
+async def get_max_min_price_endp(session: AsyncSessionDep):
+    """Obtener rango de precios - PÚBLICO"""
+    return await get_min_max_price_async(session)
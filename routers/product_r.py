@@ -1,28 +1,40 @@
-from fastapi import APIRouter, status, HTTPException
+from fastapi import APIRouter, Request, status, HTTPException
 from typing import Annotated, List, Optional
 from fastapi import Query
-from database.connection.SQLConection import SessionDep
+from database.connection.SQLConection import ReadSessionDep, SessionDep
 from database.models.product import (
     ProductCreate,
+    ProductImportReport,
+    ProductOutCursorPage,
     ProductOutPaginated, 
+    PriceStats,
     ProductUpdate, 
     ProductOut,
     ProductVariantCreateList, 
     ProductVariantOut, 
     ProductVariantUpdate,
+    StockAdjustmentList,
 )
 from controllers.product_c import (
+    adjust_stock_batch,
     create_product,
     create_product_variant,
     delete_product, delete_product_variant,
+    get_cursor_paginated_products_controller,
     get_filtered_paginated_products_controller,
+    get_price_stats,
+    get_product_by_serial,
     get_product_variants_by_product_id,
-    get_products_all,
+    get_products_batch,
+    import_products,
+    stream_products_all,
     get_products_by_id, update_product, update_product_variant,
     upsert_product_variant,
     get_min_max_price
 )
 from services.auth_s import RequireEditorOrHigher, RequireAdminOrHigher
+from services.price_stats_s import PRICE_STATS_MAX_BUCKETS
+from services.product_s import PRODUCT_FACETS_PATTERN, PRODUCT_IDS_PATTERN
 
 router = APIRouter()
 
@@ -33,18 +45,43 @@ router = APIRouter()
 @router.get("/get/{product_id}")
 def get_product_by_id_endp(
     product_id: int,
-    session: SessionDep = SessionDep
+    session: ReadSessionDep = ReadSessionDep
 ) -> ProductOut:
     """Obtener producto por ID - PÚBLICO"""
     return get_products_by_id(product_id, session)
 
 
-@router.get("/all")
-def get_products_all_endp(
-    session: SessionDep = SessionDep
+@router.get("/by-serial/{serial_number:path}")
+def get_product_by_serial_endp(
+    serial_number: str,
+    session: ReadSessionDep = ReadSessionDep
+) -> ProductOut:
+    """Obtener producto por número de serie - PÚBLICO"""
+    return get_product_by_serial(serial_number, session)
+
+
+@router.get("/batch")
+def get_products_batch_endp(
+    ids: Optional[str] = Query(None, description="Comma-separated product ids"),
+    serials: Optional[str] = Query(None, description="Comma-separated serial numbers"),
+    session: ReadSessionDep = ReadSessionDep
 ) -> List[ProductOut]:
-    """Obtener todos los productos - PÚBLICO"""
-    return get_products_all(session)
+    """Obtener varios productos por id y/o serial en una consulta - PÚBLICO
+
+    Los productos inexistentes se omiten de la respuesta.
+    """
+    return get_products_batch(ids, serials, session)
+
+
+@router.get("/all", response_model=List[ProductOut])
+def get_products_all_endp(
+    format: str = Query("json", pattern="^(json|ndjson)$", description="'json' array or 'ndjson' (one product per line)"),
+):
+    """Obtener todos los productos - PÚBLICO
+
+    La respuesta se transmite por bloques a medida que se leen de la base.
+    """
+    return stream_products_all(format)
 
 
 @router.get("/")
@@ -53,32 +90,66 @@ def get_filtered_paginated_products(
     size: int = Query(10, ge=1, le=100, description="Number of items per page"),
     categories: Optional[str] = Query(None, description="Comma-separated category names"),
     brands: Optional[str] = Query(None, description="Comma-separated brand names"),
+    category_ids: Optional[str] = Query(None, pattern=PRODUCT_IDS_PATTERN, description="Comma-separated category ids"),
+    brand_ids: Optional[str] = Query(None, pattern=PRODUCT_IDS_PATTERN, description="Comma-separated brand ids"),
     minPrice: Optional[float] = Query(None, ge=0, description="Minimum price"),
     maxPrice: Optional[float] = Query(None, ge=0, description="Maximum price"),
-    session: SessionDep = SessionDep,
-) -> ProductOutPaginated:
-    """Obtener productos paginados con filtros - PÚBLICO"""
+    pagination: str = Query("page", pattern="^(page|cursor)$", description="'page' (default) or 'cursor' (keyset)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor; implies pagination=cursor"),
+    total_mode: str = Query("exact", pattern="^(exact|estimate)$", description="'exact' count or planner 'estimate'"),
+    facets: Optional[str] = Query(None, pattern=PRODUCT_FACETS_PATTERN, description="Comma-separated facets to count: categories, brands"),
+    session: ReadSessionDep = ReadSessionDep,
+) -> ProductOutPaginated | ProductOutCursorPage:
+    """Obtener productos paginados con filtros - PÚBLICO
+
+    Con pagination=cursor (o enviando cursor) los productos se ordenan por
+    precio e id y la respuesta incluye next_cursor en lugar de total/pages.
+    Con facets=categories,brands agrega la cantidad de productos por
+    categoría y por marca para los filtros actuales.
+    """
     filters = {
         "categories": categories,
         "brands": brands,
+        "category_ids": category_ids,
+        "brand_ids": brand_ids,
         "min_price": minPrice,
         "max_price": maxPrice,
     }
-    return get_filtered_paginated_products_controller(session, page, size, filters)
+    if pagination == "cursor" or cursor:
+        return get_cursor_paginated_products_controller(session, size, filters, cursor, facets)
+    return get_filtered_paginated_products_controller(session, page, size, filters, total_mode, facets)
 
 
 @router.get("/min-max-price")
 def get_max_min_price_endp(
-    session: SessionDep = SessionDep
+    session: ReadSessionDep = ReadSessionDep
 ):
     """Obtener rango de precios - PÚBLICO"""
     return get_min_max_price(session)
 
 
+@router.get("/price-stats")
+def get_price_stats_endp(
+    categories: Optional[str] = Query(None, description="Comma-separated category names"),
+    brands: Optional[str] = Query(None, description="Comma-separated brand names"),
+    category_ids: Optional[str] = Query(None, pattern=PRODUCT_IDS_PATTERN, description="Comma-separated category ids"),
+    brand_ids: Optional[str] = Query(None, pattern=PRODUCT_IDS_PATTERN, description="Comma-separated brand ids"),
+    buckets: int = Query(10, ge=1, le=PRICE_STATS_MAX_BUCKETS, description="Histogram buckets"),
+    session: ReadSessionDep = ReadSessionDep,
+) -> PriceStats:
+    """Precio mínimo, máximo e histograma para los filtros de categoría y marca - PÚBLICO
+
+    Se calcula con un resumen en memoria que se actualiza con cada escritura,
+    sin recorrer la tabla de productos.
+    """
+    filters = {"categories": categories, "brands": brands, "category_ids": category_ids, "brand_ids": brand_ids}
+    return get_price_stats(session, filters, buckets)
+
+
 @router.get("/get/variant")
 def get_product_variants_by_product_id_endp(
     product_id: int,
-    session: SessionDep = SessionDep
+    session: ReadSessionDep = ReadSessionDep
 ) -> List[ProductVariantOut]:
     """Obtener variantes de un producto - PÚBLICO"""
     return get_product_variants_by_product_id(product_id, session)
@@ -98,6 +169,21 @@ def create_product_endp(
     return create_product(product, session)
 
 
+@router.post("/import")
+async def import_products_endp(
+    request: Request,
+    session: SessionDep,
+    admin: RequireEditorOrHigher,
+    format: str = Query("csv", pattern="^(csv|jsonl)$", description="Body format: 'csv' (with header) or 'jsonl'"),
+) -> ProductImportReport:
+    """Importar productos y variantes en bloque - REQUIERE AUTH (Editor+)
+
+    El cuerpo se lee a medida que llega y se procesa por bloques; la
+    respuesta informa el resultado de cada fila.
+    """
+    return await import_products(request.stream(), format, session)
+
+
 @router.put("/update")
 def update_product_endp(
     product_id: int,
@@ -151,6 +237,20 @@ def update_product_variant_endp(
     return update_product_variant(variant_id, variant, session)
 
 
+@router.put("/stock/adjust")
+def adjust_stock_endp(
+    stock: StockAdjustmentList,
+    session: SessionDep,
+    admin: RequireEditorOrHigher
+):
+    """Ajustar stock de varias variantes - REQUIERE AUTH (Editor+).
+
+    Aplica todos los (variant_id, delta) en una sola sentencia; si alguna
+    variante quedaría con stock negativo no se aplica ningún cambio.
+    """
+    return adjust_stock_batch(stock, session)
+
+
 @router.delete("/delete/variant")
 def delete_product_variant_endp(
     variant_id: int,
@@ -0,0 +1,93 @@
+"""
+Benchmark de lecturas del catálogo: ruta sync (threadpool) vs async (ASYNC_DB=1)
+Ejecutar: python scripts/bench_async.py [concurrencia] [segundos]
+
+Levanta dos servidores uvicorn contra la base de DATABASE_URL, uno con
+ASYNC_DB=0 y otro con ASYNC_DB=1, y los carga con la misma cantidad de
+peticiones concurrentes. Requiere httpx y el driver async (asyncpg o aiosqlite).
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+PATHS = ["/products/?size=20", "/products/get/1", "/products/min-max-price"]
+
+
+def start_server(port: int, async_db: bool) -> subprocess.Popen:
+    env = dict(os.environ, ASYNC_DB="1" if async_db else "0", ALEMBIC_RUN="1")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, base_url: str):
+    for _ in range(100):
+        try:
+            if (await client.get(f"{base_url}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"El servidor {base_url} no respondió")
+
+
+async def load(base_url: str) -> tuple[int, int, list[float]]:
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await wait_ready(client, base_url)
+        deadline = time.perf_counter() + DURATION
+        latencies: list[float] = []
+        errors = 0
+
+        async def worker(index: int):
+            nonlocal errors
+            request = index
+            while time.perf_counter() < deadline:
+                path = PATHS[request % len(PATHS)]
+                request += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"{base_url}{path}")
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker(i) for i in range(CONCURRENCY)))
+        return len(latencies), errors, latencies
+
+
+def run(name: str, port: int, async_db: bool):
+    server = start_server(port, async_db)
+    try:
+        requests_done, errors, latencies = asyncio.run(load(f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    print(f"{name}")
+    print(f"   {requests_done / DURATION:8.1f} req/s   p50 {p50:6.1f} ms   p95 {p95:6.1f} ms   errores: {errors}")
+
+
+def main():
+    print(f"🧪 {CONCURRENCY} peticiones concurrentes durante {DURATION:.0f}s: {', '.join(PATHS)}")
+    print("=" * 60)
+    run("Sync (threadpool)", 8101, async_db=False)
+    run("Async (ASYNC_DB=1)", 8102, async_db=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark de latencia de lecturas públicas durante una ráfaga de logins
+Ejecutar: python scripts/bench_login.py [logins concurrentes] [segundos]
+
+Usa una base SQLite temporal con un admin y algunos productos, levanta un
+servidor uvicorn y mide GET /products/ primero sin carga y después mientras
+varios clientes intentan loguearse con una contraseña incorrecta (cada intento
+ejecuta bcrypt). Con bcrypt fuera del event loop la latencia de las lecturas
+no debería crecer más allá de lo que cuesta compartir la CPU.
+Requiere httpx.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = Path(tempfile.gettempdir()) / "teamcelular_bench_login.db"
+if DB_PATH.exists():
+    DB_PATH.unlink()
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, str(ROOT))
+
+from sqlmodel import Session  # noqa: E402
+
+from database.connection.SQLConection import create_db_and_tables, engine  # noqa: E402
+from database.models.admin import Admin  # noqa: E402
+from database.models.product import Category, Product, ProductStatus, WarrantyUnit  # noqa: E402
+from services.auth_s import BCRYPT_ROUNDS, PASSWORD_HASH_CONCURRENCY, get_password_hash  # noqa: E402
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+READERS = 4
+PORT = 8103
+BASE_URL = f"http://127.0.0.1:{PORT}"
+
+
+def seed():
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add(Admin(username="bench", email="bench@example.com", hashed_password=get_password_hash("bench-password")))
+        category = Category(name="Baterias")
+        session.add(category)
+        session.flush()
+        for i in range(20):
+            product = Product(
+                serial_number=f"BL-{i}", name=f"Producto {i}", cost=1, retail_price=10 + i, category_id=category.id,
+            )
+            product.status = ProductStatus.ACTIVE
+            product.warranty_unit = WarrantyUnit.MONTHS
+            session.add(product)
+        session.commit()
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+async def wait_ready(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            if (await client.get(f"{BASE_URL}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"El servidor {BASE_URL} no respondió")
+
+
+async def phase(client: httpx.AsyncClient, logins: int) -> tuple[list[float], int]:
+    """Mide las lecturas durante DURATION segundos con `logins` clientes de login en paralelo"""
+    deadline = time.perf_counter() + DURATION
+    latencies: list[float] = []
+    attempts = 0
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(f"{BASE_URL}/products/?size=10")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async def login():
+        nonlocal attempts
+        while time.perf_counter() < deadline:
+            response = await client.post(
+                f"{BASE_URL}/admin/login", json={"username": "bench", "password": "incorrecta"}
+            )
+            if response.status_code != 401:
+                raise RuntimeError(f"Login respondió {response.status_code}")
+            attempts += 1
+
+    await asyncio.gather(*(reader() for _ in range(READERS)), *(login() for _ in range(logins)))
+    return latencies, attempts
+
+
+async def bench():
+    limits = httpx.Limits(max_connections=READERS + LOGINS, max_keepalive_connections=READERS + LOGINS)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        await wait_ready(client)
+        return await phase(client, 0), await phase(client, LOGINS)
+
+
+def main():
+    seed()
+    print(f"🧪 bcrypt costo {BCRYPT_ROUNDS}, {PASSWORD_HASH_CONCURRENCY} en paralelo; "
+          f"{READERS} lectores y {LOGINS} logins durante {DURATION:.0f}s")
+    print("=" * 60)
+    # Sin límite de intentos: se quiere medir el costo de bcrypt, no los 429
+    env = dict(os.environ, ALEMBIC_RUN="1", LOGIN_IP_PER_MINUTE="0", LOGIN_IDENTIFIER_PER_MINUTE="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        (idle, _), (storm, attempts) = asyncio.run(bench())
+    finally:
+        server.terminate()
+        server.wait()
+
+    for name, latencies in (("Sin logins", idle), ("Con ráfaga de logins", storm)):
+        print(f"{name}")
+        print(f"   {len(latencies) / DURATION:8.1f} req/s   p50 {percentile(latencies, 0.5):6.1f} ms   "
+              f"p95 {percentile(latencies, 0.95):6.1f} ms   max {percentile(latencies, 1):6.1f} ms")
+    print(f"Logins atendidos: {attempts / DURATION:.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark de arranque en frío: tiempo de importación y primera respuesta
+Ejecutar: python scripts/bench_startup.py [repeticiones]
+
+1. Ejecuta `python -X importtime -c "import main"`, guarda la salida completa
+   en startup_importtime.log (directorio temporal) y muestra los módulos que
+   más tardan.
+2. Arranca el servidor en frío contra la base de DATABASE_URL (incluida la
+   verificación de migraciones del lifespan) y mide cuánto tarda GET /health
+   en responder 200 por primera vez.
+
+Termina con error (código 1) si `import main` carga alguno de LAZY_MODULES o
+si se supera algún presupuesto de tiempo. Requiere httpx.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+PORT = 8104
+URL = f"http://127.0.0.1:{PORT}/health"
+IMPORTTIME_LOG = Path(tempfile.gettempdir()) / "startup_importtime.log"
+
+# Solo los usan las rutas de admin o las migraciones; se importan al usarse
+LAZY_MODULES = ("jose", "bcrypt", "alembic")
+# Presupuestos en milisegundos (la mediana de las repeticiones)
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+FIRST_RESPONSE_BUDGET_MS = float(os.getenv("STARTUP_FIRST_RESPONSE_BUDGET_MS", "3000"))
+
+
+def server_env() -> dict:
+    env = dict(os.environ)
+    env.pop("ALEMBIC_RUN", None)
+    return env
+
+
+def import_profile() -> tuple[float, list[tuple[int, str]]]:
+    """Retorna (ms de `import main`, [(µs acumulados, módulo)]) de un intérprete nuevo"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=server_env(), capture_output=True, text=True, check=True,
+    )
+    IMPORTTIME_LOG.write_text(result.stderr)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((int(cumulative), name.rstrip()))
+    total = next(cumulative for cumulative, name in modules if name.strip() == "main")
+    return total / 1000, modules
+
+
+def boot_seconds() -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT,
+        env=server_env(),
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=5) as client:
+            while time.perf_counter() - start < 60:
+                if server.poll() is not None:
+                    raise RuntimeError("El servidor terminó antes de responder")
+                try:
+                    if client.get(URL).status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError("El servidor no respondió en 60s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    print(f"🧪 Arranque en frío ({RUNS} repeticiones)")
+    print("=" * 60)
+
+    imports = []
+    for _ in range(RUNS):
+        total_ms, modules = import_profile()
+        imports.append(total_ms)
+    print(f"import main: mediana {statistics.median(imports):.0f} ms (detalle en {IMPORTTIME_LOG})")
+    for cumulative, name in sorted(modules, reverse=True)[1:11]:
+        print(f"   {cumulative / 1000:7.1f} ms  {name.strip()}")
+
+    boots = []
+    for _ in range(RUNS):
+        boots.append(boot_seconds() * 1000)
+    print(f"Primer GET /health: mediana {statistics.median(boots):.0f} ms   mínimo {min(boots):.0f} ms")
+    print()
+
+    loaded = {name.strip().split(".")[0] for _, name in modules}
+    checks = [(f"`import main` no carga {module}", module not in loaded) for module in LAZY_MODULES]
+    checks += [
+        (f"import main ≤ {IMPORT_BUDGET_MS:.0f} ms", statistics.median(imports) <= IMPORT_BUDGET_MS),
+        (f"primer GET /health ≤ {FIRST_RESPONSE_BUDGET_MS:.0f} ms", statistics.median(boots) <= FIRST_RESPONSE_BUDGET_MS),
+    ]
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    sys.exit(0 if all(ok for _, ok in checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
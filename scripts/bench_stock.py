@@ -0,0 +1,94 @@
+"""
+Benchmark de descuento de stock concurrente
+Ejecutar: python scripts/bench_stock.py [hilos] [ventas_por_hilo]
+
+Compara el descuento "leer, restar en Python y guardar" con el UPDATE
+condicional de reduce_stock_product_variant usando un pool de hilos contra
+la base de DATABASE_URL. Crea un producto temporal y lo elimina al final.
+"""
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlmodel import Session  # noqa: E402
+
+from database.connection.SQLConection import engine  # noqa: E402
+from database.models.product import Product, ProductStatus, ProductVariant, WarrantyUnit  # noqa: E402
+from services.product_s import reduce_stock_product_variant  # noqa: E402
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+SALES_PER_THREAD = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+# Menos stock que ventas para forzar la carrera por las últimas unidades
+INITIAL_STOCK = THREADS * SALES_PER_THREAD // 2
+
+
+def legacy_reduce(variant_id: int, quantity: int, session):
+    """Implementación anterior: lectura y escritura en dos viajes"""
+    variant = session.get(ProductVariant, variant_id)
+    if variant.stock < quantity:
+        raise ValueError("No hay suficiente stock")
+    variant.stock -= quantity
+    session.commit()
+
+
+def create_variant() -> tuple[int, int]:
+    with Session(engine) as session:
+        product = Product(
+            serial_number=f"BENCH-{uuid.uuid4().hex[:8]}", name="Bench stock", cost=0, retail_price=0
+        )
+        product.status = ProductStatus.ACTIVE
+        product.warranty_unit = WarrantyUnit.MONTHS
+        session.add(product)
+        session.flush()
+        variant = ProductVariant(
+            product_id=product.id, sku=f"BENCH-{uuid.uuid4().hex[:8]}", stock=INITIAL_STOCK
+        )
+        session.add(variant)
+        session.commit()
+        return product.id, variant.id
+
+
+def run(name: str, reduce):
+    product_id, variant_id = create_variant()
+
+    def worker(_):
+        sold = 0
+        with Session(engine) as session:
+            for _ in range(SALES_PER_THREAD):
+                try:
+                    reduce(variant_id, 1, session)
+                    sold += 1
+                except ValueError:
+                    session.rollback()
+        return sold
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        sold = sum(pool.map(worker, range(THREADS)))
+    elapsed = time.perf_counter() - start
+
+    with Session(engine) as session:
+        final_stock = session.get(ProductVariant, variant_id).stock
+        session.delete(session.get(Product, product_id))
+        session.commit()
+
+    attempts = THREADS * SALES_PER_THREAD
+    oversold = sold - (INITIAL_STOCK - final_stock)
+    print(f"{name}")
+    print(f"   {attempts / elapsed:8.1f} intentos/s   vendidas: {sold}   stock final: {final_stock}")
+    print(f"   {'✅' if oversold == 0 and final_stock >= 0 else '❌'} ventas sin descontar (sobreventa): {oversold}")
+
+
+def main():
+    print(f"🧪 {THREADS} hilos x {SALES_PER_THREAD} ventas, stock inicial {INITIAL_STOCK}")
+    print("=" * 60)
+    run("Leer y guardar (anterior)", legacy_reduce)
+    run("UPDATE condicional", reduce_stock_product_variant)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Script para verificar el bus de invalidación de cachés entre workers
+Ejecutar: python scripts/check_invalidation_bus.py
+
+Con InMemoryInvalidationBus simula dos workers en el mismo proceso: lo que
+publica uno lo recibe el otro, que vacía sus cachés, y cada bus ignora sus
+propios mensajes. Con CHECK_BUS_DATABASE_URL apuntando a PostgreSQL también
+prueba PostgresInvalidationBus: publicar no toma conexiones del pool y un
+lote de invalidaciones llega como mensajes sin repetidos.
+
+Falla (código 1) si alguna comprobación no se cumple.
+"""
+import json
+import os
+import select
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PG_URL = os.getenv("CHECK_BUS_DATABASE_URL")
+os.environ["DATABASE_URL"] = PG_URL or f"sqlite:///{Path(tempfile.gettempdir()) / 'teamcelular_bus.db'}"
+os.environ["READ_AFTER_WRITE_SECONDS"] = "2"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.connection import SQLConection  # noqa: E402
+from database.connection.SQLConection import engine  # noqa: E402
+from services import cache_s  # noqa: E402
+from services.cache_s import TTLCache, invalidate  # noqa: E402
+from services.invalidation_s import (  # noqa: E402
+    InMemoryInvalidationBus,
+    PostgresInvalidationBus,
+    encode_message,
+)
+
+# Caché de prueba que depende de "product"
+products_cache = TTLCache("check_bus", entities=("product",))
+
+
+def fill_cache():
+    products_cache.set("key", "value")
+
+
+def cached() -> bool:
+    return products_cache.get("key") is not None
+
+
+def memory_checks() -> list[tuple[str, bool]]:
+    worker_a, worker_b = InMemoryInvalidationBus(), InMemoryInvalidationBus()
+    worker_a.start()
+    worker_b.start()
+    checks = []
+    try:
+        # A escribe: invalida localmente y publica
+        cache_s.set_publisher(worker_a.publish)
+        SQLConection._last_write = float("-inf")
+        invalidate("product", 7)
+        message = json.loads(worker_b.received[-1]) if worker_b.received else {}
+        checks.append(("B recibe el mensaje de A", (message.get("entity"), message.get("id")) == ("product", 7)))
+        checks.append(("A no recibe su propio mensaje", worker_a.received == []))
+        checks.append(("B lee del primario tras la escritura de A", SQLConection.reads_pinned_to_primary()))
+
+        # B aplica lo recibido sin volver a publicarlo
+        fill_cache()
+        worker_b.deliver(encode_message("product", 8, worker_a.origin))
+        checks.append(("B vacía sus cachés al recibir", not cached()))
+        checks.append(("B no reenvía lo recibido", worker_a.received == []))
+
+        # Un mensaje propio (eco) se ignora
+        fill_cache()
+        worker_b.deliver(encode_message("product", 9, worker_b.origin))
+        checks.append(("B ignora sus propios mensajes", cached()))
+
+        # Un worker detenido deja de recibir
+        worker_b.stop()
+        received = len(worker_b.received)
+        worker_a.publish("product", 10)
+        checks.append(("Un bus detenido no recibe", len(worker_b.received) == received))
+    finally:
+        cache_s.set_publisher(None)
+        worker_a.stop()
+        worker_b.stop()
+    return checks
+
+
+def postgres_checks() -> list[tuple[str, bool]]:
+    bus = PostgresInvalidationBus(engine, channel="check_invalidation_bus")
+    listener = bus._connect()
+    bus.start()
+    try:
+        checked_out = engine.pool.checkedout()
+        start = time.perf_counter()
+        for product_id in range(50):
+            bus.publish("product", product_id)
+        bus.publish("product")
+        bus.publish("category", 1)
+        bus.publish("category", 1)
+        publish_ms = (time.perf_counter() - start) * 1000
+        pool_used = engine.pool.checkedout() != checked_out
+
+        payloads = []
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if select.select([listener], [], [], 0.2)[0]:
+                listener.poll()
+                while listener.notifies:
+                    payloads.append(json.loads(listener.notifies.pop(0).payload))
+            elif payloads:
+                break
+        received = [(message["entity"], message["id"]) for message in payloads]
+    finally:
+        bus.stop()
+        listener.close()
+
+    return [
+        (f"publish() no bloquea ({publish_ms:.1f} ms para 53 mensajes)", publish_ms < 50),
+        ("publish() no toma conexiones del pool", not pool_used),
+        ("Llegan los mensajes sin repetidos", len(received) == len(set(received)) and ("category", 1) in received),
+        ("Cada mensaje llega una sola vez", len(received) <= 53 and len(received) > 0),
+    ]
+
+
+def main():
+    print("🧪 Bus de invalidación")
+    print("=" * 60)
+    checks = memory_checks()
+    if PG_URL:
+        checks += postgres_checks()
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    sys.exit(0 if all(ok for _, ok in checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
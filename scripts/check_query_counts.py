@@ -0,0 +1,148 @@
+"""
+Script para verificar cuántas consultas SQL ejecuta cada endpoint de productos
+Ejecutar: python scripts/check_query_counts.py
+
+Usa una base SQLite temporal con datos de prueba y falla (código 1) si algún
+endpoint supera su presupuesto de consultas, por ejemplo por una relación
+que se carga de forma perezosa fila por fila (N+1).
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+DB_PATH = Path(tempfile.gettempdir()) / "teamcelular_query_counts.db"
+if DB_PATH.exists():
+    DB_PATH.unlink()
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from database.connection.SQLConection import create_db_and_tables, engine  # noqa: E402
+from database.models.product import (  # noqa: E402
+    Branch, Brand, Category, Product, ProductImage, ProductOut,
+    ProductOutPaginated, ProductStatus, ProductVariant, ProductVariantOut, WarrantyUnit,
+)
+from controllers import product_c  # noqa: E402
+
+PRODUCTS = 25
+
+# Consultas máximas por endpoint; no deben crecer con la cantidad de productos
+BUDGETS = {
+    "GET /products/get/{id}": 3,
+    "GET /products/by-serial/{serial}": 3,
+    "GET /products/batch": 3,
+    "GET /products/": 4,
+    "GET /products/?pagination=cursor": 4,
+    "GET /products/all": 4,
+    "GET /products/get/variant": 2,
+}
+
+
+def seed():
+    with Session(engine) as session:
+        category, brand, branch = Category(name="Baterias"), Brand(name="CK"), Branch(name="Centro")
+        session.add_all([category, brand, branch])
+        session.flush()
+        for i in range(PRODUCTS):
+            product = Product(
+                serial_number=f"QC-{i}", name=f"Producto {i}", cost=1, retail_price=10 + i,
+                category_id=category.id, brand_id=brand.id,
+            )
+            product.status = ProductStatus.ACTIVE
+            product.warranty_unit = WarrantyUnit.MONTHS
+            session.add(product)
+            session.flush()
+            for color in ("ROJO", "AZUL"):
+                variant = ProductVariant(
+                    product_id=product.id, sku=f"QC-{i}-{color}", color=color, branch_id=branch.id
+                )
+                session.add(variant)
+                session.flush()
+                session.add(ProductImage(variant_id=variant.id, image_url=f"https://img/{i}/{color}.png"))
+        session.commit()
+
+
+def count_queries(fn):
+    count = 0
+
+    def on_execute(*args):
+        nonlocal count
+        count += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return count
+
+
+def main():
+    create_db_and_tables()
+    seed()
+
+    def by_id():
+        with Session(engine) as session:
+            ProductOut.model_validate(product_c.get_products_by_id(1, session))
+
+    def by_serial():
+        with Session(engine) as session:
+            ProductOut.model_validate(product_c.get_product_by_serial("QC-1", session))
+
+    def batch():
+        ids = ",".join(str(i) for i in range(1, PRODUCTS + 1, 2))
+        serials = ",".join(f"QC-{i}" for i in range(0, PRODUCTS, 2))
+        with Session(engine) as session:
+            for product in product_c.get_products_batch(ids, serials, session):
+                ProductOut.model_validate(product)
+
+    def paginated():
+        with Session(engine) as session:
+            ProductOutPaginated.model_validate(
+                product_c.get_filtered_paginated_products_controller(session, 1, PRODUCTS, {})
+            )
+
+    def cursor():
+        with Session(engine) as session:
+            page = product_c.get_cursor_paginated_products_controller(session, PRODUCTS, {}, None)
+            for product in page["products"]:
+                ProductOut.model_validate(product)
+
+    def all_products():
+        from services.product_s import iter_products_all_db
+        for chunk in iter_products_all_db():
+            for product in chunk:
+                ProductOut.model_validate(product)
+
+    def variants():
+        with Session(engine) as session:
+            for variant in product_c.get_product_variants_by_product_id(1, session):
+                ProductVariantOut.model_validate(variant)
+
+    checks = {
+        "GET /products/get/{id}": by_id,
+        "GET /products/by-serial/{serial}": by_serial,
+        "GET /products/batch": batch,
+        "GET /products/": paginated,
+        "GET /products/?pagination=cursor": cursor,
+        "GET /products/all": all_products,
+        "GET /products/get/variant": variants,
+    }
+
+    failed = False
+    for name, fn in checks.items():
+        queries = count_queries(fn)
+        ok = queries <= BUDGETS[name]
+        failed = failed or not ok
+        print(f"{'✅' if ok else '❌'} {name}: {queries} consultas (máximo {BUDGETS[name]})")
+
+    engine.dispose()
+    DB_PATH.unlink(missing_ok=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Script para verificar que las consultas del listado de productos usan índices
+Ejecutar: python scripts/check_query_plans.py
+
+Por defecto crea una base SQLite temporal con datos de prueba (y ANALYZE) y
+revisa EXPLAIN QUERY PLAN. Con CHECK_PLANS_DATABASE_URL apuntando a PostgreSQL
+usa EXPLAIN (FORMAT JSON) sobre esa base, sin escribir datos y con
+enable_seqscan=off: así se comprueba que el índice puede resolver la consulta
+aunque la tabla sea chica y al planner le convenga recorrerla entera.
+
+Falla (código 1) si alguna consulta no usa el índice esperado, por ejemplo
+porque el filtro volvió a hacer join por nombre en lugar de usar la FK.
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+DATABASE_URL = os.getenv("CHECK_PLANS_DATABASE_URL")
+if DATABASE_URL is None:
+    DB_PATH = Path(tempfile.gettempdir()) / "teamcelular_query_plans.db"
+    if DB_PATH.exists():
+        DB_PATH.unlink()
+    DATABASE_URL = f"sqlite:///{DB_PATH}"
+os.environ["DATABASE_URL"] = DATABASE_URL
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from database.connection.SQLConection import create_db_and_tables, engine  # noqa: E402
+from database.models.product import Brand, Category, Product, ProductStatus, WarrantyUnit  # noqa: E402
+from services.product_s import (  # noqa: E402
+    cursor_products_query,
+    encode_cursor,
+    explain_statement,
+    page_products_query,
+    products_count_query,
+    total_count_query,
+)
+
+PRODUCTS = 2000
+GROUPS = 20
+
+
+def seed():
+    with Session(engine) as session:
+        categories = [Category(name=f"Categoria {i}") for i in range(GROUPS)]
+        brands = [Brand(name=f"Marca {i}") for i in range(GROUPS)]
+        session.add_all(categories + brands)
+        session.flush()
+        for i in range(PRODUCTS):
+            product = Product(
+                serial_number=f"QP-{i}", name=f"Producto {i}", cost=1, retail_price=(i * 37) % 1000,
+                category_id=categories[i % GROUPS].id, brand_id=brands[(i // GROUPS) % GROUPS].id,
+            )
+            product.status = ProductStatus.ACTIVE
+            product.warranty_unit = WarrantyUnit.MONTHS
+            session.add(product)
+        session.commit()
+        session.execute(text("ANALYZE"))
+        session.commit()
+
+
+def plan_indexes_postgresql(connection, query) -> tuple[set[str], bool]:
+    """(índices usados, hubo Seq Scan sobre product)"""
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = connection.exec_driver_sql(*explain_statement(query, engine.dialect)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    indexes, seq_scan = set(), False
+    pending = [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        if "Index Name" in node:
+            indexes.add(node["Index Name"])
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "product":
+            seq_scan = True
+        pending.extend(node.get("Plans", []))
+    return indexes, seq_scan
+
+
+def plan_indexes_sqlite(connection, query) -> tuple[set[str], bool]:
+    rows = connection.exec_driver_sql(*explain_statement(query, engine.dialect, "EXPLAIN QUERY PLAN")).all()
+    indexes, seq_scan = set(), False
+    for row in rows:
+        detail = row[-1]
+        if " INDEX " in detail:
+            indexes.add(detail.split(" INDEX ", 1)[1].split(" ")[0])
+        elif detail.startswith("SCAN product"):
+            seq_scan = True
+    return indexes, seq_scan
+
+
+def main():
+    postgresql = engine.dialect.name == "postgresql"
+    if not postgresql:
+        create_db_and_tables()
+        seed()
+    plan_indexes = plan_indexes_postgresql if postgresql else plan_indexes_sqlite
+
+    category = {"category_ids": (1,)}
+    brand = {"brand_ids": (1,)}
+    price = {"min_price": 100, "max_price": 200}
+    cursor = encode_cursor(500.0, 1000)
+    # (nombre, consulta, índice esperado)
+    checks = [
+        ("Cursor por categoría", cursor_products_query(category, 20, cursor), "ix_product_category_price_id"),
+        ("Cursor por marca", cursor_products_query(brand, 20, cursor), "ix_product_brand_price_id"),
+        ("Cursor sin filtros", cursor_products_query({}, 20, cursor), "ix_product_retail_price_id"),
+        ("Página por categoría", page_products_query(category, 2, 20), "ix_product_category_price_id"),
+        ("Total por categoría", total_count_query(products_count_query(category)), "ix_product_category_price_id"),
+        ("Total por marca", total_count_query(products_count_query(brand)), "ix_product_brand_price_id"),
+        ("Total por rango de precio", total_count_query(products_count_query(price)), "ix_product_retail_price_id"),
+    ]
+
+    print(f"🧪 Planes de consulta del listado ({engine.dialect.name})")
+    print("=" * 60)
+    failures = 0
+    for name, query, expected in checks:
+        with engine.connect() as connection, connection.begin():
+            indexes, seq_scan = plan_indexes(connection, query)
+        ok = expected in indexes and not seq_scan
+        failures += not ok
+        used = ", ".join(sorted(indexes)) or "ninguno"
+        suffix = " + recorrido completo de product" if seq_scan else ""
+        print(f"{'✅' if ok else '❌'} {name:<28} índices: {used}{suffix}")
+
+    print()
+    if failures:
+        print(f"❌ {failures} consulta(s) sin el índice esperado")
+        sys.exit(1)
+    print("✅ Todas las consultas usan el índice esperado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Script para verificar el ruteo de lecturas entre primario y réplica
+Ejecutar: python scripts/check_read_replica.py
+
+Apunta DATABASE_URL y DATABASE_READ_URL a dos archivos SQLite temporales y
+registra qué engine ejecuta cada consulta. Comprueba que:
+- los GET públicos leen de la réplica,
+- después de una escritura leen del primario durante READ_AFTER_WRITE_SECONDS,
+- las rutas de admin usan siempre el primario.
+
+Al arrancar, el commit de create_all() también cuenta como escritura, así que
+las primeras lecturas después del arranque van al primario. Falla (código 1)
+si alguna petición usa un engine distinto del esperado. Requiere httpx
+(TestClient).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TMP = Path(tempfile.gettempdir())
+PRIMARY_PATH = TMP / "teamcelular_primary.db"
+REPLICA_PATH = TMP / "teamcelular_replica.db"
+for path in (PRIMARY_PATH, REPLICA_PATH):
+    if path.exists():
+        path.unlink()
+READ_AFTER_WRITE_SECONDS = 0.5
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{PRIMARY_PATH}",
+    "DATABASE_READ_URL": f"sqlite:///{REPLICA_PATH}",
+    "READ_AFTER_WRITE_SECONDS": str(READ_AFTER_WRITE_SECONDS),
+    "ALEMBIC_RUN": "1",
+    # Sin caché HTTP: cada GET tiene que llegar a la base
+    "HTTP_RESPONSE_CACHE": "0",
+    "HTTP_SINGLE_FLIGHT": "0",
+})
+os.environ.pop("ASYNC_DB", None)
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+import main  # noqa: E402
+from database.connection.SQLConection import create_db_and_tables, engine, read_engine  # noqa: E402
+from database.models.product import Brand, Category, Product, ProductStatus, WarrantyUnit  # noqa: E402
+
+ADMIN = {"username": "replica", "email": "replica@example.com", "password": "secret123"}
+
+
+def seed():
+    """Mismo producto en las dos bases (la réplica es una copia del primario)"""
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add_all([Category(name="Baterias"), Brand(name="CK")])
+        session.flush()
+        product = Product(serial_number="RR-1", name="Batería", cost=1, retail_price=10, category_id=1, brand_id=1)
+        product.status = ProductStatus.ACTIVE
+        product.warranty_unit = WarrantyUnit.MONTHS
+        session.add(product)
+        session.commit()
+    engine.dispose()
+    shutil.copyfile(PRIMARY_PATH, REPLICA_PATH)
+
+
+class EngineLog:
+    """Anota qué engine ejecutó cada consulta"""
+
+    def __init__(self):
+        self.used: list[str] = []
+        event.listen(engine, "before_cursor_execute", lambda *args: self.used.append("primario"))
+        event.listen(read_engine, "before_cursor_execute", lambda *args: self.used.append("réplica"))
+
+    def run(self, request) -> set[str]:
+        self.used.clear()
+        response = request()
+        assert response.status_code < 400, response.text
+        return set(self.used)
+
+
+def wait_read_after_write():
+    time.sleep(READ_AFTER_WRITE_SECONDS + 0.1)
+
+
+def main_check():
+    seed()
+    # Que solo cuente la escritura del arranque, no la del seed
+    wait_read_after_write()
+    log = EngineLog()
+    checks = []
+
+    def check(name, request, expected):
+        used = log.run(request)
+        checks.append((name, used == {expected}, used))
+
+    with TestClient(main.app) as client:
+        public = lambda: client.get("/products/get/1")  # noqa: E731
+        listing = lambda: client.get("/products/", params={"size": 5})  # noqa: E731
+
+        check("Primer GET tras el arranque (commit de create_all)", public, "primario")
+        wait_read_after_write()
+        check("GET /products/get/1", public, "réplica")
+        check("GET /products/", listing, "réplica")
+
+        client.post("/admin/setup", json=ADMIN)
+        token = client.post(
+            "/admin/login", json={"identifier": ADMIN["username"], "password": ADMIN["password"]}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        wait_read_after_write()
+        check("GET /admin/list (admin)", lambda: client.get("/admin/list", headers=headers), "primario")
+        check("GET público fuera de la ventana", public, "réplica")
+
+        check(
+            "POST /categories/create (escritura)",
+            lambda: client.post("/categories/create", json={"name": "Cargadores"}, headers=headers),
+            "primario",
+        )
+        check("GET /products/ justo después de escribir", listing, "primario")
+        wait_read_after_write()
+        check(f"GET /products/ pasados {READ_AFTER_WRITE_SECONDS}s", listing, "réplica")
+
+    print("🧪 Ruteo de lecturas primario / réplica")
+    print("=" * 60)
+    for name, ok, used in checks:
+        print(f"{'✅' if ok else '❌'} {name}: {', '.join(sorted(used)) or 'sin consultas'}")
+    sys.exit(0 if all(ok for _, ok, _ in checks) else 1)
+
+
+if __name__ == "__main__":
+    main_check()
@@ -0,0 +1,91 @@
+"""
+Script para verificar que reimportar un serial existente solo actualiza las
+columnas que trae el archivo
+Ejecutar: python scripts/check_reimport.py
+
+Usa una base SQLite temporal: importa un CSV completo, marca un producto como
+DISCONTINUED y reimporta un CSV solo de precios y un JSONL parcial. Falla
+(código 1) si la reimportación pisa categoría, marca, descripción, garantía o
+estado con valores que el archivo no traía.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+DB_PATH = Path(tempfile.gettempdir()) / "teamcelular_reimport.db"
+if DB_PATH.exists():
+    DB_PATH.unlink()
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlmodel import Session, select  # noqa: E402
+
+from database.connection.SQLConection import create_db_and_tables, engine  # noqa: E402
+from database.models.product import Product, ProductStatus  # noqa: E402
+from services.import_s import import_products_db  # noqa: E402
+
+FULL_CSV = """serial_number,name,description,category,brand,warranty_time,warranty_unit,cost,retail_price,status
+RI-1,Batería A,Original,Baterias,CK,3,MONTHS,10,20,ACTIVE
+RI-2,Batería B,Compatible,Baterias,CK,6,MONTHS,11,22,ACTIVE
+"""
+PRICES_CSV = """serial_number,name,cost,retail_price
+RI-1,Batería A,15,30
+RI-3,Batería C,5,9
+"""
+PARTIAL_JSONL = '{"serial_number": "RI-2", "name": "Batería B", "cost": 12, "retail_price": 25, "description": null}\n'
+
+
+async def body(text: str):
+    yield text.encode("utf-8")
+
+
+def run_import(text: str, file_format: str) -> dict:
+    with Session(engine) as session:
+        return asyncio.run(import_products_db(body(text), file_format, session))
+
+
+def products() -> dict[str, Product]:
+    with Session(engine) as session:
+        return {product.serial_number: product for product in session.exec(select(Product)).all()}
+
+
+def main():
+    create_db_and_tables()
+    run_import(FULL_CSV, "csv")
+    before = products()
+    with Session(engine) as session:
+        product = session.get(Product, before["RI-1"].id)
+        product.status = ProductStatus.DISCONTINUED
+        session.add(product)
+        session.commit()
+
+    prices = run_import(PRICES_CSV, "csv")
+    partial = run_import(PARTIAL_JSONL, "jsonl")
+    after = products()
+    a, b, c = after["RI-1"], after["RI-2"], after["RI-3"]
+    original_a, original_b = before["RI-1"], before["RI-2"]
+
+    print("🧪 Reimportación parcial")
+    print("=" * 60)
+    checks = [
+        ("CSV de precios: 1 actualizado y 1 creado", (prices["updated"], prices["created"], prices["errors"]) == (1, 1, 0)),
+        ("Actualiza cost y retail_price", (a.cost, a.retail_price) == (15, 30)),
+        ("Conserva categoría y marca", (a.category_id, a.brand_id) == (original_a.category_id, original_a.brand_id)),
+        ("Conserva descripción y garantía", (a.description, a.warranty_time, a.warranty_unit)
+         == (original_a.description, original_a.warranty_time, original_a.warranty_unit)),
+        ("Conserva el estado DISCONTINUED", a.status == ProductStatus.DISCONTINUED),
+        ("Serial nuevo con valores por defecto", (c.category_id, c.status) == (None, ProductStatus.ACTIVE)),
+        ("JSONL parcial: 1 actualizado", (partial["updated"], partial["errors"]) == (1, 0)),
+        ("JSONL: description null la borra", b.description is None),
+        ("JSONL: conserva categoría, marca y garantía", (b.category_id, b.brand_id, b.warranty_time)
+         == (original_b.category_id, original_b.brand_id, original_b.warranty_time)),
+    ]
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    sys.exit(0 if all(ok for _, ok in checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
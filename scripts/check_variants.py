@@ -2,6 +2,8 @@
 Script para verificar variantes de productos
 Ejecutar: python scripts/check_variants.py
 """
+import json
+
 import requests
 
 API_URL = "https://fastapi-teamcelular-dev.up.railway.app"
@@ -11,15 +13,15 @@ def check_variants():
     print("🔍 Verificando variantes de productos")
     print("=" * 60)
     
-    # Obtener todos los productos
-    response = requests.get(f"{API_URL}/products/all")
+    # Obtener todos los productos (NDJSON: se procesan a medida que llegan)
+    response = requests.get(f"{API_URL}/products/all", params={"format": "ndjson"}, stream=True)
     
     if response.status_code != 200:
         print(f"❌ Error obteniendo productos: {response.text}")
         return
     
-    productos = response.json()
-    print(f"\n📦 Total de productos: {len(productos)}")
+    productos = (json.loads(line) for line in response.iter_lines() if line)
+    total_productos = 0
     
     # Estadísticas
     con_variantes = 0
@@ -30,6 +32,7 @@ def check_variants():
     print("\n" + "=" * 60)
     
     for producto in productos:
+        total_productos += 1
         variantes = producto.get("variants", [])
         nombre = producto.get("name", "Sin nombre")
         
@@ -62,6 +65,7 @@ def check_variants():
     print("=" * 60)
     print("📊 RESUMEN")
     print("=" * 60)
+    print(f"📦 Total de productos: {total_productos}")
     print(f"Productos con variantes: {con_variantes}")
     print(f"Productos sin variantes: {sin_variantes}")
     print(f"Variantes con imágenes: {con_imagenes}")
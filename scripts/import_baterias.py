@@ -12,6 +12,7 @@ import base64
 import os
 import json
 from pathlib import Path
+from urllib.parse import quote
 
 # ============================================
 # CONFIGURACIÓN
@@ -405,21 +406,23 @@ def obtener_o_crear_branch(token, nombre="Tienda Principal"):
 
 
 def buscar_producto_por_serial(token, serial):
-    """Busca un producto por su serial_number y retorna su ID si existe"""
+    """Busca un producto por su serial_number y retorna su ID si existe.
+
+    El endpoint compara el serial exacto; para no duplicar productos cargados
+    a mano con otras mayúsculas también prueba el serial en mayúsculas y en
+    minúsculas.
+    """
     headers = {"Authorization": f"Bearer {token}"}
     
     try:
-        # Endpoint correcto: /products/all
-        response = requests.get(f"{API_URL}/products/all", headers=headers)
-        if response.status_code == 200:
-            productos = response.json()
-            # Puede ser una lista o un dict con 'items'
-            if isinstance(productos, dict):
-                productos = productos.get("items", productos.get("products", []))
-            for prod in productos:
-                prod_serial = prod.get("serial_number", "") or ""
-                if prod_serial.lower() == serial.lower():
-                    return prod.get("id")
+        for candidato in dict.fromkeys([serial, serial.upper(), serial.lower()]):
+            # quote: los seriales pueden tener espacios ("BAT-X-XS MAX-CK")
+            response = requests.get(f"{API_URL}/products/by-serial/{quote(candidato, safe='')}", headers=headers)
+            if response.status_code == 200:
+                return response.json().get("id")
+            if response.status_code != 404:
+                print(f"   ⚠️ Error buscando producto (status {response.status_code}): {response.text[:200]}")
+                break
     except Exception as e:
         print(f"   ⚠️ Error buscando producto: {e}")
     return None
@@ -1,30 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Annotated
+import asyncio
 import os
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-import bcrypt
+from sqlalchemy import case, or_
 from sqlmodel import Session, select
-from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 
 from database.connection.SQLConection import get_session
-from database.models.admin import Admin, AdminRole, TokenData
+from database.models.admin import Admin, AdminOut, AdminRole, TokenData
+from services.cache_s import TTLCache
 
-load_dotenv()
+# jose y bcrypt se importan dentro de las funciones que los usan: solo los
+# necesitan las rutas de admin y así no suman al arranque en frío.
+# El .env ya lo cargó SQLConection.
 
 # Configuración de seguridad
 SECRET_KEY = os.getenv("SECRET_KEY", "tu-clave-secreta-cambiar-en-produccion")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 horas por defecto
 
+# Costo de bcrypt para hashes nuevos; los hashes con otro costo se
+# regeneran en el siguiente login correcto
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashes/verificaciones simultáneos: cada uno ocupa un núcleo ~250 ms con costo 12
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "2"))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="bcrypt")
+
+# Principales {username: AdminOut | None} para no consultar la base en cada
+# request autenticado; se invalida al crear, modificar o eliminar admins
+ADMIN_CACHE_TTL_SECONDS = float(os.getenv("ADMIN_CACHE_TTL_SECONDS", "30"))
+_admin_principals_cache = TTLCache("admin_principals", ttl=ADMIN_CACHE_TTL_SECONDS, entities=("admin",))
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/admin/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica si la contraseña coincide con el hash."""
+def _check_password(plain_password: str, hashed_password: str) -> bool:
+    import bcrypt
+
     try:
         # Truncar a 72 bytes para bcrypt
         password_bytes = plain_password.encode('utf-8')[:72]
@@ -34,17 +51,50 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
-def get_password_hash(password: str) -> str:
-    """Genera el hash de una contraseña."""
+def _hash_password(password: str) -> str:
+    import bcrypt
+
     # Truncar a 72 bytes para bcrypt
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifica si la contraseña coincide con el hash (en el executor de bcrypt)."""
+    return _password_executor.submit(_check_password, plain_password, hashed_password).result()
+
+
+def get_password_hash(password: str) -> str:
+    """Genera el hash de una contraseña (en el executor de bcrypt)."""
+    return _password_executor.submit(_hash_password, password).result()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Como verify_password, sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, _check_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Como get_password_hash, sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, _hash_password, password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si el hash fue generado con un costo distinto de BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Crea un token JWT."""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -68,30 +118,84 @@ def get_admin_by_email(session: Session, email: str) -> Admin | None:
 
 
 def get_admin_by_identifier(session: Session, identifier: str) -> Admin | None:
-    """Obtiene un admin por username o email."""
-    # Primero intentar por username
-    admin = get_admin_by_username(session, identifier)
-    if admin:
-        return admin
-    # Si no, intentar por email
-    return get_admin_by_email(session, identifier)
-
-
-def authenticate_admin(session: Session, identifier: str, password: str) -> Admin | None:
-    """Autentica un admin con username/email y password."""
-    admin = get_admin_by_identifier(session, identifier)
+    """Obtiene un admin por username o email en una sola consulta.
+
+    Si el identificador es el username de un admin y el email de otro, gana
+    el username.
+    """
+    statement = (
+        select(Admin)
+        .where(or_(Admin.username == identifier, Admin.email == identifier))
+        .order_by(case((Admin.username == identifier, 0), else_=1))
+        .limit(1)
+    )
+    return session.exec(statement).first()
+
+
+def find_admin_conflict(session: Session, username: str | None, email: str | None, exclude_id: int | None = None) -> str | None:
+    """Mensaje de error si el username o el email ya están en uso, con una sola consulta.
+
+    Es una verificación previa para dar un mensaje claro; las restricciones
+    únicas de la tabla siguen siendo las que resuelven las carreras.
+    """
+    conditions = []
+    if username:
+        conditions.append(Admin.username == username)
+    if email:
+        conditions.append(Admin.email == email)
+    if not conditions:
+        return None
+    statement = select(Admin.id, Admin.username, Admin.email).where(or_(*conditions))
+    if exclude_id is not None:
+        statement = statement.where(Admin.id != exclude_id)
+    rows = session.exec(statement).all()
+    if username and any(row.username == username for row in rows):
+        return "El nombre de usuario ya está en uso"
+    if rows:
+        return "El email ya está en uso"
+    return None
+
+
+def get_admin_principal(session: Session, username: str) -> AdminOut | None:
+    """Datos del admin sin el hash de contraseña, cacheados por username."""
+    def load():
+        admin = get_admin_by_username(session, username)
+        return AdminOut.model_validate(admin) if admin else None
+
+    return _admin_principals_cache.get_or_set(username, load)
+
+
+def save_password_hash(session: Session, admin: Admin, hashed_password: str):
+    admin.hashed_password = hashed_password
+    session.add(admin)
+    session.commit()
+
+
+async def authenticate_admin(session: Session, identifier: str, password: str) -> Admin | None:
+    """Autentica un admin con username/email y password.
+
+    La consulta corre en el threadpool y bcrypt en su executor acotado, así
+    que un login no bloquea el event loop. Si el hash usa otro costo que
+    BCRYPT_ROUNDS se regenera con la contraseña recién verificada.
+    """
+    admin = await run_in_threadpool(get_admin_by_identifier, session, identifier)
     if not admin:
         return None
-    if not verify_password(password, admin.hashed_password):
+    if not await verify_password_async(password, admin.hashed_password):
         return None
+    if needs_rehash(admin.hashed_password):
+        new_hash = await get_password_hash_async(password)
+        await run_in_threadpool(save_password_hash, session, admin, new_hash)
     return admin
 
 
 async def get_current_admin(
     token: Annotated[str, Depends(oauth2_scheme)],
     session: Annotated[Session, Depends(get_session)]
-) -> Admin:
-    """Obtiene el admin actual a partir del token JWT."""
+) -> AdminOut:
+    """Obtiene el admin actual a partir del token JWT (cacheado, ver get_admin_principal)."""
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
@@ -106,7 +210,7 @@ async def get_current_admin(
     except JWTError:
         raise credentials_exception
     
-    admin = get_admin_by_username(session, token_data.username)
+    admin = get_admin_principal(session, token_data.username)
     if admin is None:
         raise credentials_exception
     if not admin.is_active:
@@ -118,8 +222,8 @@ async def get_current_admin(
 
 
 async def get_current_active_admin(
-    current_admin: Annotated[Admin, Depends(get_current_admin)]
-) -> Admin:
+    current_admin: Annotated[AdminOut, Depends(get_current_admin)]
+) -> AdminOut:
     """Verifica que el admin esté activo."""
     if not current_admin.is_active:
         raise HTTPException(
@@ -132,8 +236,8 @@ async def get_current_active_admin(
 def require_role(allowed_roles: list[AdminRole]):
     """Decorator para requerir ciertos roles."""
     async def role_checker(
-        current_admin: Annotated[Admin, Depends(get_current_active_admin)]
-    ) -> Admin:
+        current_admin: Annotated[AdminOut, Depends(get_current_active_admin)]
+    ) -> AdminOut:
         if current_admin.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -144,7 +248,8 @@ def require_role(allowed_roles: list[AdminRole]):
 
 
 # Dependencias pre-configuradas para usar en los endpoints
-RequireAdmin = Annotated[Admin, Depends(get_current_active_admin)]
-RequireSuperAdmin = Annotated[Admin, Depends(require_role([AdminRole.SUPER_ADMIN]))]
-RequireEditorOrHigher = Annotated[Admin, Depends(require_role([AdminRole.SUPER_ADMIN, AdminRole.ADMIN, AdminRole.EDITOR]))]
-RequireAdminOrHigher = Annotated[Admin, Depends(require_role([AdminRole.SUPER_ADMIN, AdminRole.ADMIN]))]
+# (reciben un AdminOut; para modificar el registro cargar Admin por id)
+RequireAdmin = Annotated[AdminOut, Depends(get_current_active_admin)]
+RequireSuperAdmin = Annotated[AdminOut, Depends(require_role([AdminRole.SUPER_ADMIN]))]
+RequireEditorOrHigher = Annotated[AdminOut, Depends(require_role([AdminRole.SUPER_ADMIN, AdminRole.ADMIN, AdminRole.EDITOR]))]
+RequireAdminOrHigher = Annotated[AdminOut, Depends(require_role([AdminRole.SUPER_ADMIN, AdminRole.ADMIN]))]
@@ -1,12 +1,38 @@
 
 from sqlmodel import select
-from database.models.product import Branch, BranchCreate
+from database.models.product import Branch, BranchCreate, BranchOut
+from services.cache_s import CATALOG_CACHE_TTL_SECONDS, TTLCache, invalidate
+
+# Snapshot {id: BranchOut} de la tabla completa; se invalida al escribir sucursales
+_branches_cache = TTLCache("branches", ttl=CATALOG_CACHE_TTL_SECONDS, entities=("branch",))
+
+def get_branches_snapshot(session) -> dict[int, BranchOut]:
+    return _branches_cache.get_or_set(
+        "all",
+        lambda: {row.id: BranchOut.model_validate(row) for row in session.exec(select(Branch)).all()},
+    )
 
 def ensure_branch_exists(branch_id: int, session):
-    branch = session.exec(select(Branch).where(Branch.id == branch_id)).first()
-    if not branch:
+    branch = get_branches_snapshot(session).get(branch_id)
+    if branch is not None:
+        return branch
+    # Puede haberse creado después del snapshot (por ejemplo en otro worker)
+    db_branch = session.exec(select(Branch).where(Branch.id == branch_id)).first()
+    if not db_branch:
         raise ValueError(f"Branch with id {branch_id} does not exist")
-    return branch
+    _branches_cache.clear()
+    return BranchOut.model_validate(db_branch)
+
+def ensure_branches_exist(branch_ids, session):
+    """Verifica varias sucursales con a lo sumo una consulta"""
+    snapshot = get_branches_snapshot(session)
+    missing = set(branch_ids) - set(snapshot)
+    if not missing:
+        return
+    found = set(session.exec(select(Branch.id).where(Branch.id.in_(missing))).all())
+    if missing - found:
+        raise ValueError(f"Branch with id {min(missing - found)} does not exist")
+    _branches_cache.clear()
 
 def unique_constraint_branch(branch: BranchCreate, session):
     branch = session.exec(select(Branch).where(Branch.name == branch.name)).first()
@@ -23,6 +49,7 @@ def create_branch_db(branch: BranchCreate, session):
         )
         session.add(db_branch)
         session.commit()
+        invalidate("branch", db_branch.id)
     except Exception as e:
         session.rollback()
         raise e
@@ -31,9 +58,11 @@ def create_branch_db(branch: BranchCreate, session):
 
 def delete_branch_db(branch_id: int, session):
     try:
-        db_branch = ensure_branch_exists(branch_id, session)
+        ensure_branch_exists(branch_id, session)
+        db_branch = session.get(Branch, branch_id)
         session.delete(db_branch)
         session.commit()
+        invalidate("branch", branch_id)
     except Exception as e:
         session.rollback()
         raise e
@@ -47,6 +76,7 @@ def update_branch_db(branch_id: int, branch: BranchCreate, session):
             setattr(db_branch, key, value)
         session.commit()
         session.refresh(db_branch)
+        invalidate("branch", branch_id)
     except Exception as e:
         session.rollback()
         raise e
@@ -54,8 +84,7 @@ def update_branch_db(branch_id: int, branch: BranchCreate, session):
 
 def get_branches_all(session):
     try:
-        branches = session.exec(select(Branch)).all()
-        return branches
+        return list(get_branches_snapshot(session).values())
     except Exception as e:
         session.rollback()
-        raise e
\ No newline at end of file
+        raise e
@@ -1,12 +1,41 @@
 
 from sqlmodel import select
-from database.models.product import Brand, BrandCreate
+from database.models.product import Brand, BrandCreate, BrandOut
+from services.cache_s import CATALOG_CACHE_TTL_SECONDS, TTLCache, invalidate
+
+# Snapshot {id: BrandOut} de la tabla completa; se invalida al escribir marcas
+_brands_cache = TTLCache("brands", ttl=CATALOG_CACHE_TTL_SECONDS, entities=("brand",))
+
+def get_brands_snapshot(session) -> dict[int, BrandOut]:
+    return _brands_cache.get_or_set(
+        "all",
+        lambda: {row.id: BrandOut.model_validate(row) for row in session.exec(select(Brand)).all()},
+    )
+
+def get_brand_ids_by_name(session) -> dict[str, int]:
+    """Nombre -> id de las marcas, para filtrar productos por la FK"""
+    return _brands_cache.get_or_set(
+        "ids_by_name",
+        lambda: {item.name: item.id for item in get_brands_snapshot(session).values()},
+    )
+
+async def get_brand_ids_by_name_async(session) -> dict[str, int]:
+    async def compute():
+        rows = await session.execute(select(Brand.id, Brand.name))
+        return {row.name: row.id for row in rows}
+
+    return await _brands_cache.get_or_set_async("ids_by_name", compute)
 
 def ensure_brand_exists(brand_id: int, session):
-    brand = session.exec(select(Brand).where(Brand.id == brand_id)).first()
-    if not brand:
+    brand = get_brands_snapshot(session).get(brand_id)
+    if brand is not None:
+        return brand
+    # Puede haberse creado después del snapshot (por ejemplo en otro worker)
+    db_brand = session.exec(select(Brand).where(Brand.id == brand_id)).first()
+    if not db_brand:
         raise ValueError(f"brand with id {brand_id} does not exist")
-    return brand
+    _brands_cache.clear()
+    return BrandOut.model_validate(db_brand)
 
 def unique_constraint_brand(brand: BrandCreate, session):
     brand = session.exec(select(Brand).where(Brand.name == brand.name)).first()
@@ -23,6 +52,7 @@ def create_brand_db(brand: BrandCreate, session):
         )
         session.add(db_brand)
         session.commit()
+        invalidate("brand", db_brand.id)
     except Exception as e:
         session.rollback()
         raise e
@@ -31,9 +61,11 @@ def create_brand_db(brand: BrandCreate, session):
 
 def delete_brand_db(brand_id: int, session):
     try:
-        db_brand = ensure_brand_exists(brand_id, session)
+        ensure_brand_exists(brand_id, session)
+        db_brand = session.get(Brand, brand_id)
         session.delete(db_brand)
         session.commit()
+        invalidate("brand", brand_id)
     except Exception as e:
         session.rollback()
         raise e
@@ -46,6 +78,7 @@ def update_brand_db(brand_id: int, brand: BrandCreate, session):
             setattr(db_brand, key, value)
         session.commit()
         session.refresh(db_brand)
+        invalidate("brand", brand_id)
     except Exception as e:
         session.rollback()
         raise e
@@ -53,8 +86,7 @@ def update_brand_db(brand_id: int, brand: BrandCreate, session):
 
 def get_brands_all(session):
     try:
-        brands = session.exec(select(Brand)).all()
-        return brands
+        return list(get_brands_snapshot(session).values())
     except Exception as e:
         session.rollback()
-        raise e
\ No newline at end of file
+        raise e
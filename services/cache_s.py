@@ -0,0 +1,145 @@
+"""
+Caché en memoria con TTL e invalidación por entidad
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.singleflight_s import SingleFlight
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+# Tablas chicas que casi no cambian (categorías, marcas, sucursales)
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+
+# Cachés registradas por entidad ("product", "category", "brand", ...)
+_caches_by_entity: dict[str, list["TTLCache"]] = {}
+_registry_lock = threading.Lock()
+
+_MISSING = object()
+
+# Función que propaga invalidaciones a otros procesos (ver invalidation_s)
+_publisher = None
+
+# Funciones llamadas con el id escrito, para estructuras que se actualizan
+# fila por fila en lugar de vaciarse (ver price_stats_s)
+_listeners_by_entity: dict[str, list] = {}
+
+
+class TTLCache:
+    """Caché thread-safe con expiración por TTL y descarte LRU.
+
+    Cada caché declara de qué entidades depende; invalidate(entity) la vacía
+    cuando alguna de ellas se escribe. get_or_set() calcula cada clave una
+    sola vez aunque varias peticiones la pidan al mismo tiempo.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = CACHE_TTL_SECONDS,
+        maxsize: int = CACHE_MAX_ENTRIES,
+        entities: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Se incrementa en cada clear() para descartar valores calculados
+        # con datos anteriores a la invalidación
+        self._generation = 0
+        self._flights = SingleFlight()
+        with _registry_lock:
+            for entity in entities:
+                _caches_by_entity.setdefault(entity, []).append(self)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation: int | None = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        """Retorna el valor cacheado o lo calcula con factory() y lo guarda"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+
+        def compute():
+            value = factory()
+            self.set(key, value, generation)
+            return value
+
+        # Con la generación en la clave, quien llega después de una
+        # invalidación no espera un cálculo que empezó antes
+        return self._flights.do((generation, key), compute)
+
+    async def get_or_set_async(self, key, factory):
+        """Como get_or_set, pero factory() es una corrutina"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self._generation
+
+        async def compute():
+            value = await factory()
+            self.set(key, value, generation)
+            return value
+
+        return await self._flights.do_async((generation, key), compute)
+
+    @property
+    def generation(self) -> int:
+        """Pasar a set() para descartar el valor si hubo una invalidación en el medio"""
+        return self._generation
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def set_publisher(publisher):
+    """Registra publisher(entity, entity_id), llamado en cada invalidación local"""
+    global _publisher
+    _publisher = publisher
+
+
+def on_invalidate(entity: str, listener):
+    """Registra listener(entity_id), llamado en cada invalidación de la entidad (local o remota)"""
+    with _registry_lock:
+        _listeners_by_entity.setdefault(entity, []).append(listener)
+
+
+def invalidate(entity: str, entity_id=None, publish: bool = True):
+    """Vacía todas las cachés que dependen de la entidad indicada.
+
+    Con publish=True también avisa al resto de los workers/réplicas.
+    """
+    for cache in _caches_by_entity.get(entity, ()):
+        cache.clear()
+    for listener in _listeners_by_entity.get(entity, ()):
+        listener(entity_id)
+    if publish and _publisher is not None:
+        _publisher(entity, entity_id)
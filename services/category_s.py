@@ -1,12 +1,41 @@
 
 from sqlmodel import select
-from database.models.product import Category, CategoryCreate
+from database.models.product import Category, CategoryCreate, CategoryOut
+from services.cache_s import CATALOG_CACHE_TTL_SECONDS, TTLCache, invalidate
+
+# Snapshot {id: CategoryOut} de la tabla completa; se invalida al escribir categorías
+_categories_cache = TTLCache("categories", ttl=CATALOG_CACHE_TTL_SECONDS, entities=("category",))
+
+def get_categories_snapshot(session) -> dict[int, CategoryOut]:
+    return _categories_cache.get_or_set(
+        "all",
+        lambda: {row.id: CategoryOut.model_validate(row) for row in session.exec(select(Category)).all()},
+    )
+
+def get_category_ids_by_name(session) -> dict[str, int]:
+    """Nombre -> id de las categorías, para filtrar productos por la FK"""
+    return _categories_cache.get_or_set(
+        "ids_by_name",
+        lambda: {item.name: item.id for item in get_categories_snapshot(session).values()},
+    )
+
+async def get_category_ids_by_name_async(session) -> dict[str, int]:
+    async def compute():
+        rows = await session.execute(select(Category.id, Category.name))
+        return {row.name: row.id for row in rows}
+
+    return await _categories_cache.get_or_set_async("ids_by_name", compute)
 
 def ensure_category_exists(category_id: int, session):
-    category = session.exec(select(Category).where(Category.id == category_id)).first()
-    if not category:
+    category = get_categories_snapshot(session).get(category_id)
+    if category is not None:
+        return category
+    # Puede haberse creado después del snapshot (por ejemplo en otro worker)
+    db_category = session.exec(select(Category).where(Category.id == category_id)).first()
+    if not db_category:
         raise ValueError(f"category with id {category_id} does not exist")
-    return category
+    _categories_cache.clear()
+    return CategoryOut.model_validate(db_category)
 
 def unique_constraint_category(category: CategoryCreate, session):
     category = session.exec(select(Category).where(Category.name == category.name)).first()
@@ -23,6 +52,7 @@ def create_category_db(category: CategoryCreate, session):
         )
         session.add(db_category)
         session.commit()
+        invalidate("category", db_category.id)
     except Exception as e:
         session.rollback()
         raise e
@@ -31,9 +61,11 @@ def create_category_db(category: CategoryCreate, session):
 
 def delete_category_db(category_id: int, session):
     try:
-        db_category = ensure_category_exists(category_id, session)
+        ensure_category_exists(category_id, session)
+        db_category = session.get(Category, category_id)
         session.delete(db_category)
         session.commit()
+        invalidate("category", category_id)
     except Exception as e:
         session.rollback()
         raise e
@@ -47,6 +79,7 @@ def update_category_db(category_id: int, category: CategoryCreate, session):
             setattr(db_category, key, value)
         session.commit()
         session.refresh(db_category)
+        invalidate("category", category_id)
     except Exception as e:
         session.rollback()
         raise e
@@ -54,8 +87,7 @@ def update_category_db(category_id: int, category: CategoryCreate, session):
 
 def get_categories_all_db(session):
     try:
-        categorys = session.exec(select(Category)).all()
-        return categorys
+        return list(get_categories_snapshot(session).values())
     except Exception as e:
         session.rollback()
-        raise e
\ No newline at end of file
+        raise e
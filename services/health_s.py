@@ -0,0 +1,125 @@
+"""
+Estado de salud del servicio para las sondas de la plataforma
+
+Un hilo en segundo plano consulta la base cada HEALTH_PROBE_INTERVAL_SECONDS
+y guarda el resultado; /health y /health/ready responden con esa última foto
+sin abrir conexiones, así que muchas sondas no ocupan slots del pool.
+"""
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from database.connection.SQLConection import engine
+from database.connection.migrations import alembic_config, database_heads, script_revisions
+from database.connection.pool import pool_metrics
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "5"))
+# Una sonda más vieja que esto (por ejemplo, trabada esperando el pool) deja
+# al servicio como no listo
+HEALTH_STALE_SECONDS = HEALTH_PROBE_INTERVAL_SECONDS * 3
+
+
+class HealthProbe:
+    """Ejecuta SELECT 1 y revisa las migraciones en un hilo propio"""
+
+    def __init__(self, engine, interval: float = HEALTH_PROBE_INTERVAL_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self.last: dict | None = None
+        self._revisions: tuple[set[str], set[str]] | None = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _migration_state(self, connection) -> str:
+        # Las migraciones solo aplican a PostgreSQL (ver migrations.upgrade_to_head)
+        if connection.dialect.name != "postgresql":
+            return "skipped"
+        if self._revisions is None:
+            self._revisions = script_revisions(alembic_config())
+        heads, known = self._revisions
+        current = database_heads(connection)
+        if current == heads:
+            return "current"
+        # Revisión desconocida: la base ya la migró una versión más nueva de la app
+        return "ahead" if current - known else "pending"
+
+    def probe(self) -> dict:
+        start = time.perf_counter()
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                migrations = self._migration_state(connection)
+            database = "connected"
+        except Exception as e:
+            logger.warning("Sonda de salud fallida: %s", e)
+            database, migrations = "disconnected", "unknown"
+        self.last = {
+            "database": database,
+            "migrations": migrations,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": time.monotonic(),
+        }
+        return self.last
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="health-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+_probe: HealthProbe | None = None
+
+
+def start_health_probe():
+    global _probe
+    _probe = HealthProbe(engine)
+    _probe.start()
+    return _probe
+
+
+def stop_health_probe():
+    global _probe
+    if _probe is not None:
+        _probe.stop()
+        _probe = None
+
+
+def pool_saturation() -> dict | None:
+    """Métricas del pool principal con la fracción de conexiones en uso"""
+    metrics = pool_metrics(engine)
+    if metrics is None:
+        return None
+    capacity = metrics["pool_size"] + metrics["max_overflow"]
+    metrics["saturation"] = round(metrics["checked_out"] / capacity, 3) if capacity else 0.0
+    return metrics
+
+
+def readiness() -> tuple[bool, dict]:
+    """(listo, detalle) a partir de la última sonda, sin tocar la base"""
+    last = _probe.last if _probe is not None else None
+    if last is None:
+        return False, {"status": "starting", "database": "unknown", "migrations": "unknown"}
+    age = time.monotonic() - last["checked_at"]
+    ready = last["database"] == "connected" and last["migrations"] != "pending" and age <= HEALTH_STALE_SECONDS
+    return ready, {
+        "status": "ready" if ready else "not_ready",
+        "database": last["database"],
+        "migrations": last["migrations"],
+        "probe_age_seconds": round(age, 1),
+        "probe_latency_ms": last["latency_ms"],
+        "pool": pool_saturation(),
+    }
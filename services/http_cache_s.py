@@ -0,0 +1,192 @@
+"""
+Caché HTTP de las lecturas públicas del catálogo (ETag, Last-Modified, 304)
+
+Un middleware ASGI guarda el cuerpo ya serializado de cada GET público junto
+con un ETag fuerte (hash del cuerpo). Mientras la entrada siga vigente las
+peticiones se responden desde memoria, y las que traen If-None-Match o
+If-Modified-Since vigentes reciben 304 sin tocar la base. Las entradas
+dependen de las mismas entidades que cache_s, así que cualquier escritura
+(local o de otro worker vía invalidation_s) las descarta. Las peticiones
+idénticas que llegan juntas se resuelven con un solo cálculo (single-flight).
+"""
+import hashlib
+import os
+import re
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
+
+from services.cache_s import TTLCache
+from services.singleflight_s import SingleFlight
+
+HTTP_RESPONSE_CACHE = os.getenv("HTTP_RESPONSE_CACHE", "1") == "1"
+# Une las peticiones idénticas simultáneas en un solo cálculo
+HTTP_SINGLE_FLIGHT = os.getenv("HTTP_SINGLE_FLIGHT", "1") == "1"
+# Navegadores revalidan siempre (304 baratos); un CDN puede servir s-maxage segundos
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "public, max-age=0, s-maxage=30, stale-while-revalidate=30")
+
+
+class ResponseCache(TTLCache):
+    """TTLCache que recuerda cuándo se invalidó por última vez (para Last-Modified)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.changed_at = time.time()
+
+    def clear(self):
+        super().clear()
+        self.changed_at = time.time()
+
+
+_products_responses = ResponseCache("http_products", entities=("product", "category", "brand", "branch"))
+
+# (patrón del path, caché); solo GET públicos cuyo cuerpo depende de esas entidades
+CACHED_ROUTES = (
+    (re.compile(r"^/products/(get/\d+|min-max-price|price-stats)?$"), _products_responses),
+    (re.compile(r"^/categories/get/all$"), ResponseCache("http_categories", entities=("category",))),
+    (re.compile(r"^/brands/get/all$"), ResponseCache("http_brands", entities=("brand",))),
+    (re.compile(r"^/branches/get/all$"), ResponseCache("http_branches", entities=("branch",))),
+)
+
+
+def match_route(path: str) -> ResponseCache | None:
+    for pattern, cache in CACHED_ROUTES:
+        if pattern.match(path):
+            return cache
+    return None
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """Path + parámetros ordenados, para que ?a=1&b=2 y ?b=2&a=1 compartan entrada"""
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    try:
+        return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+class CachedResponse:
+    __slots__ = ("body", "content_type", "etag", "last_modified")
+
+    def __init__(self, body: bytes, content_type: bytes, last_modified: float):
+        self.body = body
+        self.content_type = content_type
+        self.etag = make_etag(body)
+        self.last_modified = last_modified
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"etag", self.etag.encode()),
+            (b"last-modified", formatdate(self.last_modified, usegmt=True).encode()),
+            (b"cache-control", HTTP_CACHE_CONTROL.encode()),
+        ]
+
+    def is_fresh_for(self, request_headers: dict[bytes, bytes]) -> bool:
+        """True si el cliente ya tiene esta versión (If-None-Match tiene prioridad)"""
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match.decode("latin-1"), self.etag)
+        if_modified_since = request_headers.get(b"if-modified-since")
+        if if_modified_since is not None:
+            return not_modified_since(if_modified_since.decode("latin-1"), self.last_modified)
+        return False
+
+    async def send(self, send, request_headers: dict[bytes, bytes]):
+        if self.is_fresh_for(request_headers):
+            await send({"type": "http.response.start", "status": 304, "headers": self.headers()})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = self.headers() + [
+            (b"content-type", self.content_type),
+            (b"content-length", str(len(self.body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class ResponseCacheMiddleware:
+    """Middleware ASGI para CACHED_ROUTES.
+
+    Con cache=True sirve desde memoria mientras la entrada esté vigente. Con
+    coalesce=True las peticiones idénticas (mismo path y mismos parámetros) que
+    llegan mientras otra se está calculando esperan ese cálculo y comparten sus
+    bytes; vale tanto para handlers sync (threadpool) como async.
+    """
+
+    def __init__(self, app, cache: bool = HTTP_RESPONSE_CACHE, coalesce: bool = HTTP_SINGLE_FLIGHT):
+        self.app = app
+        self.cache = cache
+        self.coalesce = coalesce
+        self._flights = SingleFlight()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        cache = match_route(scope["path"])
+        request_headers = dict(scope["headers"])
+        # Las lecturas públicas no dependen del token, pero por las dudas no se mezclan
+        if cache is None or b"authorization" in request_headers:
+            return await self.app(scope, receive, send)
+
+        key = cache_key(scope["path"], scope["query_string"])
+        if self.cache:
+            cached = cache.get(key)
+            if cached is not None:
+                return await cached.send(send, request_headers)
+
+        generation = cache.generation
+
+        async def compute():
+            return await self.render(scope, receive, cache, key, generation)
+
+        if self.coalesce:
+            # Quien llega después de una invalidación no se suma a un cálculo anterior
+            response = await self._flights.do_async((generation, key), compute)
+        else:
+            response = await compute()
+
+        if isinstance(response, CachedResponse):
+            return await response.send(send, request_headers)
+        start_message, body = response
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
+
+    async def render(self, scope, receive, cache, key, generation):
+        """Ejecuta la ruta; retorna CachedResponse si respondió 200 o (inicio, cuerpo) si no"""
+        changed_at = cache.changed_at
+        start_message = None
+        chunks: list[bytes] = []
+
+        async def capture(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        if start_message["status"] != 200:
+            return start_message, body
+
+        content_type = dict(start_message["headers"]).get(b"content-type", b"application/json")
+        response = CachedResponse(body, content_type, changed_at)
+        if self.cache:
+            # Misma protección que get_or_set: no guardar lo calculado antes de una invalidación
+            cache.set(key, response, generation)
+        return response
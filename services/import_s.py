@@ -0,0 +1,356 @@
+"""
+Importación masiva de productos y variantes desde CSV o JSONL
+
+El cuerpo se lee como flujo y se procesa por bloques: cada bloque resuelve
+categorías, marcas y sucursales por nombre con una consulta, hace upsert de
+los productos por serial_number con INSERT ... ON CONFLICT (actualizando solo
+las columnas que trae el archivo) y escribe las variantes con
+bulk_write_variants_db. Cada bloque se confirma por separado.
+"""
+import csv
+import json
+import os
+from datetime import datetime
+
+from pydantic import ValidationError
+from sqlalchemy import func, or_
+from sqlalchemy.future import select
+from starlette.concurrency import run_in_threadpool
+
+from database.models.product import (
+    Branch,
+    Brand,
+    Category,
+    Product,
+    ProductImportRow,
+    ProductImportRowResult,
+    ProductVariantCreate,
+)
+from services.branch_s import get_branches_snapshot
+from services.brand_s import get_brands_snapshot
+from services.cache_s import invalidate
+from services.category_s import get_categories_snapshot
+from services.product_s import bulk_write_variants_db, dialect_insert
+
+PRODUCTS_IMPORT_CHUNK_SIZE = int(os.getenv("PRODUCTS_IMPORT_CHUNK_SIZE", "500"))
+
+REQUIRED_COLUMNS = ("serial_number", "name", "cost", "retail_price")
+
+# Campo de la fila -> columna del producto que actualiza si el serial ya existe
+PRODUCT_UPDATE_COLUMNS = {
+    "name": "name",
+    "description": "description",
+    "category": "category_id",
+    "brand": "brand_id",
+    "warranty_time": "warranty_time",
+    "warranty_unit": "warranty_unit",
+    "cost": "cost",
+    "retail_price": "retail_price",
+    "status": "status",
+}
+
+
+# =============================================
+# LECTURA DEL FLUJO
+# =============================================
+
+async def iter_lines(byte_chunks):
+    """Divide un flujo de bytes en líneas de texto UTF-8"""
+    buffer = b""
+    first = True
+    async for chunk in byte_chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8").rstrip("\r")
+            if first:
+                text, first = text.lstrip("\ufeff"), False
+            yield text
+    if buffer:
+        text = buffer.decode("utf-8").rstrip("\r")
+        yield text.lstrip("\ufeff") if first else text
+
+
+async def iter_import_records(byte_chunks, file_format: str):
+    """Genera (línea, registro, error) por cada fila del cuerpo"""
+    header = None
+    pending: list[str] = []
+    line_no = start = 0
+    async for line in iter_lines(byte_chunks):
+        line_no += 1
+        if file_format == "jsonl":
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, None, "JSON inválido"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "Se esperaba un objeto JSON"
+                continue
+            yield line_no, record, None
+            continue
+
+        # CSV: un registro puede ocupar varias líneas si tiene comillas abiertas
+        if not pending:
+            start = line_no
+        pending.append(line)
+        text = "\n".join(pending)
+        if text.count('"') % 2:
+            continue
+        pending = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [column.strip().lower() for column in values]
+            missing = [column for column in REQUIRED_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"Faltan columnas obligatorias en el CSV: {', '.join(missing)}")
+            continue
+        if len(values) != len(header):
+            yield start, None, f"Se esperaban {len(header)} columnas y llegaron {len(values)}"
+            continue
+        yield start, dict(zip(header, values)), None
+
+    if pending:
+        yield start, None, "Comillas sin cerrar al final del archivo"
+
+
+async def iter_import_chunks(byte_chunks, file_format: str, chunk_size: int = PRODUCTS_IMPORT_CHUNK_SIZE):
+    """Agrupa los registros en bloques de chunk_size filas"""
+    chunk = []
+    async for record in iter_import_records(byte_chunks, file_format):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# =============================================
+# ESCRITURA POR BLOQUES
+# =============================================
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+def resolve_names_db(model, names, snapshot, session) -> tuple[dict[str, int], bool]:
+    """Mapa {nombre en minúsculas: id}; crea los nombres que no existen.
+
+    Usa el snapshot en memoria y consulta la base una sola vez por los
+    faltantes antes de crearlos. Retorna también si se creó alguno.
+    """
+    by_name: dict[str, int] = {}
+    for item in sorted(snapshot.values(), key=lambda item: item.id, reverse=True):
+        by_name[item.name.lower()] = item.id
+
+    wanted = {name.lower(): name for name in names if name}
+    missing = {key: name for key, name in wanted.items() if key not in by_name}
+    if not missing:
+        return by_name, False
+
+    # Puede haberse creado después del snapshot (por ejemplo en otro worker)
+    for row in session.execute(
+        select(model.id, model.name).where(func.lower(model.name).in_(list(missing))).order_by(model.id.desc())
+    ):
+        by_name[row.name.lower()] = row.id
+    new = [model(name=name) for key, name in missing.items() if key not in by_name]
+    if not new:
+        return by_name, False
+    session.add_all(new)
+    session.flush()
+    for item in new:
+        by_name[item.name.lower()] = item.id
+    return by_name, True
+
+
+def write_import_rows_db(rows: list[tuple[int, ProductImportRow]], session) -> dict[int, ProductImportRowResult]:
+    """Escribe las filas válidas de un bloque en una sola transacción"""
+    results: dict[int, ProductImportRowResult] = {}
+
+    def fail(line, row, message):
+        results[line] = ProductImportRowResult(
+            line=line, serial_number=row.serial_number, status="error", error=message
+        )
+
+    categories, new_categories = resolve_names_db(
+        Category, {row.category for _, row in rows}, get_categories_snapshot(session), session
+    )
+    brands, new_brands = resolve_names_db(
+        Brand, {row.brand for _, row in rows}, get_brands_snapshot(session), session
+    )
+    branches, new_branches = resolve_names_db(
+        Branch, {row.branch for _, row in rows}, get_branches_snapshot(session), session
+    )
+
+    # Los datos del producto los define la última fila de cada serial
+    latest = {row.serial_number: row for _, row in rows}
+    # serial -> (category_id, brand_id) de los productos que ya existen
+    existing: dict[str, tuple] = {}
+
+    def identity(row):
+        """(nombre, categoría, marca) que tendrá el producto después del upsert"""
+        category_id, brand_id = existing.get(row.serial_number, (None, None))
+        if "category" in row.model_fields_set:
+            category_id = categories[row.category.lower()] if row.category else None
+        if "brand" in row.model_fields_set:
+            brand_id = brands[row.brand.lower()] if row.brand else None
+        return row.name, category_id, brand_id
+
+    # (nombre, categoría, marca) -> serial; es único en la tabla
+    owners: dict[tuple, str] = {}
+    for product in session.execute(
+        select(Product.serial_number, Product.name, Product.category_id, Product.brand_id).where(
+            or_(
+                Product.serial_number.in_(list(latest)),
+                Product.name.in_({row.name for row in latest.values()}),
+            )
+        )
+    ):
+        if product.serial_number in latest:
+            existing[product.serial_number] = (product.category_id, product.brand_id)
+        owners[(product.name, product.category_id, product.brand_id)] = product.serial_number
+
+    rejected: dict[str, str] = {}
+    for serial, row in latest.items():
+        key = identity(row)
+        # La restricción no aplica si la categoría o la marca son NULL
+        if None in key[1:]:
+            continue
+        owner = owners.setdefault(key, serial)
+        if owner != serial:
+            rejected[serial] = (
+                f"Ya existe otro producto (serial {owner}) con el mismo nombre, categoría y marca"
+            )
+
+    now = datetime.now()
+    # Al actualizar solo se escriben las columnas que trae la fila (encabezado
+    # del CSV o claves del JSONL); las filas con las mismas columnas comparten
+    # una sentencia, así un CSV es un único INSERT ... ON CONFLICT por bloque
+    groups: dict[tuple, list[dict]] = {}
+    for serial, row in latest.items():
+        if serial in rejected:
+            continue
+        update_columns = tuple(
+            column for field, column in PRODUCT_UPDATE_COLUMNS.items() if field in row.model_fields_set
+        )
+        groups.setdefault(update_columns, []).append({
+            "serial_number": serial,
+            "name": row.name,
+            "description": row.description,
+            "category_id": identity(row)[1],
+            "brand_id": identity(row)[2],
+            "warranty_time": row.warranty_time,
+            "warranty_unit": row.warranty_unit,
+            "cost": row.cost,
+            "retail_price": row.retail_price,
+            "status": row.status,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    product_ids: dict[str, int] = {}
+    table = Product.__table__
+    for update_columns, values in groups.items():
+        statement = dialect_insert(session, table).values(values)
+        if not hasattr(statement, "on_conflict_do_update"):
+            raise ValueError("La importación masiva requiere PostgreSQL o SQLite")
+        statement = statement.on_conflict_do_update(
+            index_elements=["serial_number"],
+            set_={column: statement.excluded[column] for column in update_columns + ("updated_at",)},
+        ).returning(table.c.id, table.c.serial_number)
+        product_ids.update({row.serial_number: row.id for row in session.execute(statement)})
+
+    variant_rows = []
+    for line, row in rows:
+        if row.serial_number in rejected:
+            fail(line, row, rejected[row.serial_number])
+            continue
+        results[line] = ProductImportRowResult(
+            line=line,
+            serial_number=row.serial_number,
+            status="updated" if row.serial_number in existing else "created",
+            product_id=product_ids[row.serial_number],
+        )
+        if row.branch:
+            variant_rows.append((line, row))
+
+    if variant_rows:
+        variants = bulk_write_variants_db(
+            [
+                ProductVariantCreate(
+                    product_id=product_ids[row.serial_number],
+                    branch_id=branches[row.branch.lower()],
+                    color=row.color,
+                    size=row.size,
+                    size_unit=row.size_unit,
+                    unit=row.unit,
+                    stock=row.stock,
+                    min_stock=row.min_stock,
+                    images=row.images,
+                )
+                for _, row in variant_rows
+            ],
+            session,
+            upsert=True,
+            commit=False,
+        )
+        for (line, _), variant in zip(variant_rows, variants):
+            results[line].variant_id = variant.id
+
+    session.commit()
+    if product_ids:
+        invalidate("product")
+    for entity, created in (("category", new_categories), ("brand", new_brands), ("branch", new_branches)):
+        if created:
+            invalidate(entity)
+    return results
+
+
+def import_chunk_db(records, session) -> list[ProductImportRowResult]:
+    """Valida y escribe un bloque; un error de base marca todo el bloque"""
+    results: dict[int, ProductImportRowResult] = {}
+    rows = []
+    for line, record, error in records:
+        if error is None:
+            try:
+                rows.append((line, ProductImportRow.model_validate(record)))
+                continue
+            except ValidationError as e:
+                error = validation_message(e)
+        serial = (record or {}).get("serial_number")
+        results[line] = ProductImportRowResult(
+            line=line, serial_number=str(serial) if serial else None, status="error", error=error
+        )
+
+    if rows:
+        try:
+            results.update(write_import_rows_db(rows, session))
+        except Exception as e:
+            session.rollback()
+            message = str(e) if isinstance(e, ValueError) else f"Error al importar el bloque: {e}"
+            for line, row in rows:
+                results[line] = ProductImportRowResult(
+                    line=line, serial_number=row.serial_number, status="error", error=message
+                )
+    return [results[line] for line in sorted(results)]
+
+
+async def import_products_db(byte_chunks, file_format: str, session) -> dict:
+    """Importa el flujo completo y retorna el reporte por fila"""
+    rows: list[ProductImportRowResult] = []
+    async for chunk in iter_import_chunks(byte_chunks, file_format):
+        rows.extend(await run_in_threadpool(import_chunk_db, chunk, session))
+    return {
+        "total": len(rows),
+        "created": sum(row.status == "created" for row in rows),
+        "updated": sum(row.status == "updated" for row in rows),
+        "errors": sum(row.status == "error" for row in rows),
+        "rows": rows,
+    }
@@ -0,0 +1,212 @@
+"""
+Bus de invalidación de cachés entre procesos (PostgreSQL LISTEN/NOTIFY)
+
+Cada escritura que llama a cache_s.invalidate() publica un mensaje con el
+tipo de entidad y su id; el listener de cada worker lo recibe y vacía sus
+cachés locales. Los mensajes propios se ignoran porque ya se invalidaron.
+La publicación no bloquea la petición: un hilo envía los mensajes encolados
+en lotes, por una conexión propia y en un solo viaje por lote.
+"""
+import json
+import logging
+import os
+import queue
+import select as io_select
+import threading
+import uuid
+
+from database.connection.SQLConection import engine, mark_primary_write
+from services import cache_s
+
+logger = logging.getLogger(__name__)
+
+# "auto" (postgres si la base es PostgreSQL), "postgres", "memory" u "off"
+CACHE_INVALIDATION_BUS = os.getenv("CACHE_INVALIDATION_BUS", "auto")
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "catalog_invalidation")
+RECONNECT_SECONDS = 5.0
+
+# Identifica a este proceso en los mensajes
+PROCESS_ID = uuid.uuid4().hex
+
+
+def encode_message(entity: str, entity_id=None, origin: str = PROCESS_ID) -> str:
+    return json.dumps({"origin": origin, "entity": entity, "id": entity_id}, separators=(",", ":"))
+
+
+def handle_message(payload: str, origin: str = PROCESS_ID):
+    """Aplica localmente una invalidación recibida de otro proceso"""
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        logger.warning("Mensaje de invalidación inválido: %r", payload)
+        return
+    if message.get("origin") == origin:
+        return
+    # Otro worker escribió: leer del primario mientras la réplica se pone al día
+    mark_primary_write()
+    cache_s.invalidate(message["entity"], message.get("id"), publish=False)
+
+
+class PostgresInvalidationBus:
+    """Publica con pg_notify y escucha con LISTEN, cada uno en su conexión dedicada"""
+
+    def __init__(self, engine, channel: str = CACHE_INVALIDATION_CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread = None
+        # Mensajes pendientes de publicar; None detiene el hilo publicador
+        self._outbox: queue.SimpleQueue = queue.SimpleQueue()
+        self._publisher = None
+
+    def publish(self, entity: str, entity_id=None):
+        """Encola el mensaje; lo envía el hilo publicador, sin demorar la petición"""
+        self._outbox.put((entity, entity_id))
+
+    def _drain(self, first) -> tuple[list[str], bool]:
+        """Junta lo encolado en un lote sin repetidos: (payloads, detener)"""
+        pending, stop = [first], False
+        while True:
+            try:
+                item = self._outbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            pending.append(item)
+        # Un mensaje sin id ya invalida toda la entidad
+        whole = {entity for entity, entity_id in pending if entity_id is None}
+        messages = dict.fromkeys(
+            (entity, None if entity in whole else entity_id) for entity, entity_id in pending
+        )
+        return [encode_message(entity, entity_id) for entity, entity_id in messages], stop
+
+    def _publish_loop(self):
+        conn = None
+        stop = False
+        while not stop:
+            item = self._outbox.get()
+            if item is None:
+                break
+            payloads, stop = self._drain(item)
+            try:
+                if conn is None:
+                    conn = self._connect(listen=False)
+                # Todo el lote en un solo viaje a la base
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                        (self.channel, payloads),
+                    )
+            except Exception:
+                # La escritura ya se confirmó; los demás workers caerán por TTL
+                logger.exception("No se pudieron publicar %d invalidaciones", len(payloads))
+                if conn is not None:
+                    conn.close()
+                    conn = None
+        if conn is not None:
+            conn.close()
+
+    def _connect(self, listen: bool = True):
+        # Conexión DBAPI propia, fuera del pool, para no ocupar un slot
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        conn = self.engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+        conn.autocommit = True
+        if listen:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                while not self._stop.is_set():
+                    ready, _, _ = io_select.select([conn], [], [], 1.0)
+                    if not ready:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        handle_message(conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Listener de invalidación desconectado; reintentando")
+                self._stop.wait(RECONNECT_SECONDS)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._thread.start()
+        self._publisher = threading.Thread(target=self._publish_loop, name="cache-invalidation-publish", daemon=True)
+        self._publisher.start()
+
+    def stop(self):
+        self._stop.set()
+        # Lo ya encolado se envía antes de terminar
+        self._outbox.put(None)
+        for thread in (self._thread, self._publisher):
+            if thread is not None:
+                thread.join(timeout=5)
+
+
+class InMemoryInvalidationBus:
+    """Sustituto en memoria: los buses del mismo proceso simulan workers"""
+
+    _subscribers: list["InMemoryInvalidationBus"] = []
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.received: list[str] = []
+
+    def publish(self, entity: str, entity_id=None):
+        payload = encode_message(entity, entity_id, self.origin)
+        for bus in list(self._subscribers):
+            if bus is not self:
+                bus.deliver(payload)
+
+    def deliver(self, payload: str):
+        self.received.append(payload)
+        handle_message(payload, self.origin)
+
+    def start(self):
+        self._subscribers.append(self)
+
+    def stop(self):
+        if self in self._subscribers:
+            self._subscribers.remove(self)
+
+
+_bus = None
+
+
+def create_bus():
+    mode = CACHE_INVALIDATION_BUS
+    if mode == "auto":
+        mode = "postgres" if engine.dialect.name == "postgresql" else "off"
+    if mode == "postgres":
+        return PostgresInvalidationBus(engine)
+    if mode == "memory":
+        return InMemoryInvalidationBus()
+    return None
+
+
+def start_invalidation_listener():
+    """Inicia el bus configurado y lo conecta a cache_s.invalidate()"""
+    global _bus
+    _bus = create_bus()
+    if _bus is None:
+        return None
+    _bus.start()
+    cache_s.set_publisher(_bus.publish)
+    return _bus
+
+
+def stop_invalidation_listener():
+    global _bus
+    cache_s.set_publisher(None)
+    if _bus is not None:
+        _bus.stop()
+        _bus = None
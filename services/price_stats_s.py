@@ -0,0 +1,190 @@
+"""
+Resumen de precios en memoria para el slider de la tienda
+
+Guarda los precios de venta agrupados por (categoría, marca) en listas
+ordenadas. Se carga una vez (id, categoría, marca y precio de cada producto)
+y después se mantiene fila por fila: product_s lo actualiza al crear, editar
+o borrar un producto y cualquier otra escritura (importaciones, otros
+workers) marca los productos afectados para releerlos en la siguiente
+consulta. Así mínimo, máximo e histograma salen de memoria sin recorrer la
+tabla.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from sqlalchemy.future import select
+
+from database.models.product import Product
+from services.cache_s import on_invalidate
+
+PRICE_STATS_MAX_BUCKETS = 50
+
+
+class PriceSummary:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # id -> (category_id, brand_id, retail_price); None = sin cargar
+        self._rows: dict[int, tuple] | None = None
+        # (category_id, brand_id) -> precios ordenados
+        self._groups: dict[tuple, list[float]] = {}
+        # Productos a releer; None = recargar todo
+        self._dirty: set[int] | None = None
+        # Cambia con cada modificación; _refresh_async lo usa para detectar
+        # escrituras mientras esperaba la consulta
+        self._version = 0
+
+    def _add(self, product_id: int, category_id, brand_id, retail_price: float):
+        self._rows[product_id] = (category_id, brand_id, retail_price)
+        insort(self._groups.setdefault((category_id, brand_id), []), retail_price)
+
+    def _remove(self, product_id: int):
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        group_key = (row[0], row[1])
+        prices = self._groups[group_key]
+        del prices[bisect_left(prices, row[2])]
+        if not prices:
+            del self._groups[group_key]
+
+    def _refresh_query(self):
+        """(consulta, recarga_completa) pendiente o None si el resumen está al día"""
+        query = select(Product.id, Product.category_id, Product.brand_id, Product.retail_price)
+        if self._rows is None or self._dirty is None:
+            return query, True
+        if self._dirty:
+            return query.where(Product.id.in_(list(self._dirty))), False
+        return None
+
+    def _apply(self, rows, full: bool):
+        """Aplica lo leído por _refresh_query (con el lock tomado)"""
+        if full:
+            self._rows, self._groups = {}, {}
+        else:
+            for product_id in self._dirty:
+                self._remove(product_id)
+        for row in rows:
+            self._add(row.id, row.category_id, row.brand_id, row.retail_price)
+        self._dirty = set()
+        self._version += 1
+
+    def _refresh(self, session):
+        """Carga el resumen o relee los productos marcados (con el lock tomado)"""
+        pending = self._refresh_query()
+        if pending is not None:
+            query, full = pending
+            self._apply(session.execute(query).all(), full)
+
+    async def _refresh_async(self, session):
+        """Como _refresh con una sesión async; la consulta corre sin el lock y
+        se reintenta si mientras tanto hubo otra escritura"""
+        while True:
+            with self._lock:
+                pending = self._refresh_query()
+                version = self._version
+            if pending is None:
+                return
+            query, full = pending
+            rows = (await session.execute(query)).all()
+            with self._lock:
+                if self._version == version:
+                    self._apply(rows, full)
+                    return
+
+    def mark_dirty(self, product_id=None):
+        with self._lock:
+            if self._rows is None or self._dirty is None:
+                return
+            if product_id is None:
+                self._dirty = None
+            else:
+                self._dirty.add(product_id)
+            self._version += 1
+
+    def set_product(self, product_id: int, category_id, brand_id, retail_price: float):
+        """Aplica un producto recién escrito sin volver a consultarlo"""
+        with self._lock:
+            if self._rows is None or self._dirty is None:
+                return
+            self._remove(product_id)
+            self._add(product_id, category_id, brand_id, retail_price)
+            self._dirty.discard(product_id)
+            self._version += 1
+
+    def remove_product(self, product_id: int):
+        with self._lock:
+            if self._rows is None or self._dirty is None:
+                return
+            self._remove(product_id)
+            self._dirty.discard(product_id)
+            self._version += 1
+
+    def stats(self, session, category_ids: set[int] | None = None, brand_ids: set[int] | None = None, buckets: int = 10) -> dict:
+        """Mínimo, máximo, cantidad e histograma de buckets de igual ancho.
+
+        category_ids / brand_ids en None no filtran; un conjunto vacío no
+        coincide con ningún producto.
+        """
+        with self._lock:
+            self._refresh(session)
+            return self._stats(category_ids, brand_ids, buckets)
+
+    async def stats_async(self, session, category_ids: set[int] | None = None, brand_ids: set[int] | None = None, buckets: int = 10) -> dict:
+        await self._refresh_async(session)
+        with self._lock:
+            return self._stats(category_ids, brand_ids, buckets)
+
+    def _stats(self, category_ids, brand_ids, buckets: int) -> dict:
+        groups = [
+            prices for (category_id, brand_id), prices in self._groups.items()
+            if (category_ids is None or category_id in category_ids)
+            and (brand_ids is None or brand_id in brand_ids)
+        ]
+        count = sum(len(prices) for prices in groups)
+        if not count:
+            return {"min": None, "max": None, "count": 0, "buckets": []}
+        low = min(prices[0] for prices in groups)
+        high = max(prices[-1] for prices in groups)
+        if low == high:
+            buckets = 1
+        width = (high - low) / buckets
+        edges = [low + width * i for i in range(buckets)] + [high]
+        histogram = []
+        for i in range(buckets):
+            # Cada bucket es [desde, hasta) salvo el último, que incluye el máximo
+            upper = bisect_right if i == buckets - 1 else bisect_left
+            histogram.append({
+                "min": round(edges[i], 2),
+                "max": round(edges[i + 1], 2),
+                "count": sum(upper(prices, edges[i + 1]) - bisect_left(prices, edges[i]) for prices in groups),
+            })
+        return {"min": low, "max": high, "count": count, "buckets": histogram}
+
+
+price_summary = PriceSummary()
+on_invalidate("product", price_summary.mark_dirty)
+
+
+def get_price_stats_db(session, filters: dict, buckets: int = 10) -> dict:
+    """Estadísticas de precio para los filtros de categoría y marca del listado.
+
+    filters ya resueltos a ids (product_s.resolve_product_filters).
+    """
+    category_ids, brand_ids = filters.get("category_ids"), filters.get("brand_ids")
+    return price_summary.stats(
+        session,
+        None if category_ids is None else set(category_ids),
+        None if brand_ids is None else set(brand_ids),
+        buckets,
+    )
+
+
+def get_price_bounds_db(session) -> tuple:
+    """(máximo, mínimo) de todo el catálogo, como get_max_min_price_db"""
+    stats = price_summary.stats(session, buckets=1)
+    return stats["max"], stats["min"]
+
+
+async def get_price_bounds_db_async(session) -> tuple:
+    stats = await price_summary.stats_async(session, buckets=1)
+    return stats["max"], stats["min"]
@@ -1,42 +1,66 @@
 """
 Servicio de productos - Operaciones de base de datos
 """
-from typing import List
+from datetime import datetime
+from functools import lru_cache
+from typing import List, get_args
+import base64
+import json
+import os
 import uuid
 from fastapi import HTTPException, status
-from sqlmodel import select
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import case, delete, insert, inspect as sa_inspect, or_, update
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy.sql import func
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql import func, tuple_
 
+from database.connection.SQLConection import current_read_engine
 from database.models.product import (
     Branch,
     Brand,
     Category,
     Product,
     ProductImage,
+    ProductOut,
+    ProductOutSimple,
     ProductUpdate,
     ProductVariant,
+    ProductVariantOut,
     ProductVariantUpdate,
 )
-from services.branch_s import ensure_branch_exists
-from services.brand_s import ensure_brand_exists
+from services.branch_s import ensure_branches_exist
+from services.brand_s import ensure_brand_exists, get_brand_ids_by_name, get_brand_ids_by_name_async
+from services.category_s import ensure_category_exists, get_category_ids_by_name, get_category_ids_by_name_async
+from services.cache_s import TTLCache, invalidate
+from services.price_stats_s import get_price_bounds_db, get_price_bounds_db_async, price_summary
+
+# Productos por bloque al transmitir el catálogo completo
+PRODUCTS_STREAM_CHUNK_SIZE = int(os.getenv("PRODUCTS_STREAM_CHUNK_SIZE", "200"))
+
+# Máximo de ids + seriales por consulta en GET /products/batch
+PRODUCTS_BATCH_MAX = 100
+
+# Totales de listados paginados por filtro normalizado; se invalida al
+# escribir productos, categorías o marcas (los nombres se resuelven a ids)
+_total_count_cache = TTLCache("product_totals", entities=("product", "category", "brand"))
+
+# Conteos por (categoría, marca) para las facetas del listado, por rango de precio
+_facet_rows_cache = TTLCache("product_facets", entities=("product", "category", "brand"))
+
+# Facetas que acepta GET /products/?facets=
+PRODUCT_FACETS = ("categories", "brands")
+PRODUCT_FACETS_PATTERN = "^({0})(,({0}))*$".format("|".join(PRODUCT_FACETS))
+
+# category_ids / brand_ids del listado: ids separados por coma
+PRODUCT_IDS_PATTERN = r"^\d+(,\d+)*$"
 
 
 # =============================================
 # VALIDACIONES
 # =============================================
 
-def ensure_category_exists(category_id: int, session):
-    """Verifica que la categoría exista"""
-    if category_id is None:
-        return None
-    category = session.exec(select(Category).where(Category.id == category_id)).scalar()
-    if not category:
-        raise ValueError(f"Categoría con id {category_id} no existe")
-    return category
-
-
 def ensure_product_exists_serial(product_serial: str, session):
     """Verifica que el producto exista por serial"""
     product = session.exec(
@@ -73,48 +97,57 @@ def ensure_product_variant_exists(variant_id: int, session):
     return variant
 
 
-def find_existing_variant(product_id, color, size, size_unit, unit, session):
-    """Busca una variante existente con las mismas características.
-    Maneja correctamente comparaciones con NULL en SQL.
+def invalidate_products(product_ids):
+    """Invalida las cachés de productos una sola vez por lote.
+
+    Con un único producto conserva el id (el resto de los workers solo
+    releen ese producto); con varios manda un único mensaje para toda la
+    entidad, como la importación.
     """
-    from sqlalchemy import and_, or_
-    
-    # Construir condiciones dinámicamente para manejar NULL correctamente
-    conditions = [ProductVariant.product_id == product_id]
-    
-    # Para cada campo opcional, usar IS NULL si es None, o == si tiene valor
-    if color is None:
-        conditions.append(ProductVariant.color.is_(None))
-    else:
-        conditions.append(ProductVariant.color == color)
-    
-    if size is None:
-        conditions.append(ProductVariant.size.is_(None))
-    else:
-        conditions.append(ProductVariant.size == size)
-    
-    if size_unit is None:
-        conditions.append(ProductVariant.size_unit.is_(None))
-    else:
-        conditions.append(ProductVariant.size_unit == size_unit)
-    
-    if unit is None:
-        conditions.append(ProductVariant.unit.is_(None))
-    else:
-        conditions.append(ProductVariant.unit == unit)
-    
-    variant = session.exec(
-        select(ProductVariant).where(and_(*conditions))
-    ).first()
-    return variant
+    product_ids = set(product_ids)
+    if product_ids:
+        invalidate("product", next(iter(product_ids)) if len(product_ids) == 1 else None)
 
 
-def ensure_unique_constraints_product_variant(product_id, color, size, size_unit, unit, session):
-    """Verifica unicidad de variante"""
-    variant = find_existing_variant(product_id, color, size, size_unit, unit, session)
-    if variant:
-        raise ValueError("Ya existe una variante con las mismas características de color, tamaño y unidad.")
-    return variant
+# =============================================
+# PLANIFICADOR DE CARGA DE RELACIONES
+# =============================================
+
+def _nested_schema(annotation):
+    """Extrae el schema Pydantic de una anotación (X, X | None, list[X])"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        schema = _nested_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+@lru_cache(maxsize=None)
+def loader_options(model, schema) -> tuple:
+    """Opciones de carga para las relaciones de `model` que `schema` serializa.
+
+    Las relaciones a uno se traen con joinedload en la misma consulta y las
+    colecciones con selectinload (una consulta por relación, no por fila),
+    recorriendo los schemas anidados. Así la serialización no dispara
+    cargas perezosas y cada endpoint ejecuta un número fijo de consultas.
+    """
+    relationships = sa_inspect(model).relationships
+    options = []
+    for name, field in schema.model_fields.items():
+        relationship = relationships.get(name)
+        if relationship is None:
+            continue
+        attribute = getattr(model, name)
+        option = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        nested = _nested_schema(field.annotation)
+        if nested is not None:
+            sub_options = loader_options(relationship.mapper.class_, nested)
+            if sub_options:
+                option = option.options(*sub_options)
+        options.append(option)
+    return tuple(options)
 
 
 # =============================================
@@ -166,6 +199,8 @@ def create_product_db(product, session):
         session.add(db_product)
         session.commit()
         session.refresh(db_product)
+        invalidate("product", db_product.id)
+        price_summary.set_product(db_product.id, db_product.category_id, db_product.brand_id, db_product.retail_price)
         return db_product
 
     except HTTPException:
@@ -178,26 +213,79 @@ def create_product_db(product, session):
         )
 
 
-def get_products_all_db(session):
-    """Obtiene todos los productos"""
+def iter_products_all_db(chunk_size: int = PRODUCTS_STREAM_CHUNK_SIZE):
+    """Genera todos los productos en bloques de chunk_size.
+
+    Usa un cursor del servidor (yield_per) con su propia sesión, que vive
+    mientras se consume el generador; cada bloque trae sus relaciones en
+    consultas por lote, así la memoria no depende del tamaño del catálogo.
+    """
+    query = (
+        select(Product)
+        .options(*loader_options(Product, ProductOut))
+        .order_by(Product.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    with Session(current_read_engine()) as session:
+        for chunk in session.execute(query).scalars().partitions():
+            yield chunk
+
+
+def product_by_id_query(product_id: int):
+    return select(Product).where(Product.id == product_id).options(*loader_options(Product, ProductOut))
+
+
+def get_product_by_id_db(session, product_id: int):
+    """Obtiene un producto por ID"""
     try:
-        products = session.exec(select(Product)).scalars().all()
-        return products
+        db_product = session.execute(product_by_id_query(product_id)).unique().scalar()
+        if not db_product:
+            raise ValueError(f"Producto con id {product_id} no existe")
+        return db_product
     except Exception as e:
         session.rollback()
         raise e
 
 
-def get_product_by_id_db(session, product_id: int):
-    """Obtiene un producto por ID"""
+def get_product_by_serial_db(session, serial_number: str):
+    """Obtiene un producto por serial (índice único de serial_number)"""
     try:
-        db_product = ensure_product_exists_id(product_id, session)
+        db_product = session.execute(
+            select(Product)
+            .where(Product.serial_number == serial_number)
+            .options(*loader_options(Product, ProductOut))
+        ).unique().scalar()
+        if not db_product:
+            raise ValueError(f"Producto con serial {serial_number} no existe")
         return db_product
     except Exception as e:
         session.rollback()
         raise e
 
 
+def get_products_batch_db(session, ids: list[int], serials: list[str]):
+    """Obtiene varios productos por id y/o serial en una sola consulta.
+
+    Retorna los encontrados en el orden pedido (primero ids, luego seriales),
+    sin repetir; los inexistentes se omiten.
+    """
+    if not ids and not serials:
+        return []
+    try:
+        products = session.execute(
+            select(Product)
+            .where(or_(Product.id.in_(ids), Product.serial_number.in_(serials)))
+            .options(*loader_options(Product, ProductOut))
+        ).unique().scalars().all()
+    except Exception as e:
+        session.rollback()
+        raise e
+    by_id = {product.id: product for product in products}
+    by_serial = {product.serial_number: product for product in products}
+    ordered = [by_id.get(product_id) for product_id in ids] + [by_serial.get(serial) for serial in serials]
+    return list({product.id: product for product in ordered if product is not None}.values())
+
+
 def update_product_db(product_id: int, product: ProductUpdate, session):
     """Actualiza un producto"""
     try:
@@ -206,6 +294,8 @@ def update_product_db(product_id: int, product: ProductUpdate, session):
             setattr(db_product, key, value)
         session.commit()
         session.refresh(db_product)
+        invalidate("product", product_id)
+        price_summary.set_product(product_id, db_product.category_id, db_product.brand_id, db_product.retail_price)
         return db_product
     except Exception as e:
         session.rollback()
@@ -218,115 +308,512 @@ def delete_product_db(product_id: int, session):
         db_product = ensure_product_exists_id(product_id, session)
         session.delete(db_product)
         session.commit()
+        invalidate("product", product_id)
+        price_summary.remove_product(product_id)
         return {"msg": "Producto eliminado correctamente"}
     except Exception as e:
         session.rollback()
         raise e
 
 
-def fetch_products_with_filters(session, page: int, size: int, filters: dict):
-    """Obtiene productos con filtros y paginación"""
-    query = select(Product).options(
-        selectinload(Product.category),
-        selectinload(Product.brand),
-        selectinload(Product.variants)
+def filter_ids(names: str | None, ids: str | None, ids_by_name: dict[str, int]) -> tuple[int, ...] | None:
+    """Ids de un filtro del listado: los enviados como ids más los de los
+    nombres separados por comas. None si no hay filtro; los nombres
+    desconocidos no agregan ids (una tupla vacía no coincide con nada).
+    """
+    if not names and not ids:
+        return None
+    resolved = {int(value) for value in ids.split(",")} if ids else set()
+    if names:
+        resolved.update(ids_by_name[str(name)] for name in names.split(",") if name in ids_by_name)
+    return tuple(sorted(resolved))
+
+
+def _resolved(filters: dict, category_ids_by_name: dict, brand_ids_by_name: dict) -> dict:
+    return {
+        "category_ids": filter_ids(filters.get("categories"), filters.get("category_ids"), category_ids_by_name),
+        "brand_ids": filter_ids(filters.get("brands"), filters.get("brand_ids"), brand_ids_by_name),
+        "min_price": filters.get("min_price"),
+        "max_price": filters.get("max_price"),
+    }
+
+
+def resolve_product_filters(session, filters: dict) -> dict:
+    """Pasa los nombres de categoría y marca a ids con los mapas cacheados,
+    para filtrar por las FK sin joins. Solo consulta los mapas si hay nombres.
+    """
+    return _resolved(
+        filters,
+        get_category_ids_by_name(session) if filters.get("categories") else {},
+        get_brand_ids_by_name(session) if filters.get("brands") else {},
     )
 
-    # Aplicar filtros
-    if filters.get("categories"):
-        category_names = [str(name) for name in filters["categories"].split(",")]
-        query = query.join(Product.category).where(Category.name.in_(category_names))
 
-    if filters.get("brands"):
-        brand_names = [str(name) for name in filters["brands"].split(",")]
-        query = query.join(Product.brand).where(Brand.name.in_(brand_names))
+async def resolve_product_filters_async(session, filters: dict) -> dict:
+    return _resolved(
+        filters,
+        await get_category_ids_by_name_async(session) if filters.get("categories") else {},
+        await get_brand_ids_by_name_async(session) if filters.get("brands") else {},
+    )
 
-    if filters.get("min_price") is not None or filters.get("max_price") is not None:
-        min_price = filters.get("min_price", 0)
-        max_price = filters.get("max_price", float('inf'))
-        query = query.where(Product.retail_price.between(min_price, max_price))
 
-    # Contar total
-    total_query = select(func.count()).select_from(query.subquery())
-    total = session.execute(total_query).scalar()
+def apply_product_filters(query, filters: dict):
+    """Aplica los filtros (ya resueltos a ids) de categoría, marca y precio.
 
-    # Obtener productos paginados
-    result = session.execute(
-        query.offset((page - 1) * size).limit(size)
+    Con los índices (category_id | brand_id, retail_price, id) cada filtro es
+    un rango sobre un índice, sin join a category ni brand.
+    """
+    if filters.get("category_ids") is not None:
+        query = query.where(Product.category_id.in_(filters["category_ids"]))
+
+    if filters.get("brand_ids") is not None:
+        query = query.where(Product.brand_id.in_(filters["brand_ids"]))
+
+    if filters.get("min_price") is not None:
+        query = query.where(Product.retail_price >= filters["min_price"])
+
+    if filters.get("max_price") is not None:
+        query = query.where(Product.retail_price <= filters["max_price"])
+
+    return query
+
+
+def normalize_filters(filters: dict) -> tuple:
+    """Clave hashable para filtros resueltos (los ids ya vienen ordenados)"""
+    return (
+        filters.get("category_ids"),
+        filters.get("brand_ids"),
+        filters.get("min_price"),
+        filters.get("max_price"),
     )
+
+
+def explain_statement(query, dialect, prefix: str = "EXPLAIN (FORMAT JSON)") -> tuple[str, dict | tuple]:
+    """SQL y parámetros de EXPLAIN (FORMAT JSON) para ejecutar con exec_driver_sql"""
+    compiled = query.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return f"{prefix} {compiled}", params
+
+
+def plan_rows(plan) -> int:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(session, query) -> int | None:
+    """Estima las filas de una consulta con las estadísticas del planner.
+
+    Solo disponible en PostgreSQL; retorna None en otros motores.
+    """
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    plan = session.connection().exec_driver_sql(*explain_statement(query, bind.dialect)).scalar()
+    return plan_rows(plan)
+
+
+def products_count_query(filters: dict):
+    return apply_product_filters(select(Product.id), filters)
+
+
+def total_count_query(query):
+    return select(func.count()).select_from(query.subquery())
+
+
+def count_products_with_filters(session, filters: dict, total_mode: str = "exact"):
+    """Cuenta productos filtrados usando la caché de totales.
+
+    Con total_mode="estimate" usa la estimación del planner si está disponible.
+    Retorna (total, modo_efectivo).
+    """
+    query = products_count_query(filters)
+
+    def compute():
+        if total_mode == "estimate":
+            estimate = estimate_count(session, query)
+            if estimate is not None:
+                return estimate, "estimate"
+        return session.execute(total_count_query(query)).scalar(), "exact"
+
+    return _total_count_cache.get_or_set((normalize_filters(filters), total_mode), compute)
+
+
+def page_products_query(filters: dict, page: int, size: int):
+    query = select(Product).options(*loader_options(Product, ProductOutSimple))
+    return apply_product_filters(query, filters).offset((page - 1) * size).limit(size)
+
+
+def fetch_products_with_filters(session, page: int, size: int, filters: dict, total_mode: str = "exact"):
+    """Obtiene productos con filtros (resueltos) y paginación.
+
+    Retorna (productos, total, modo_del_total).
+    """
+    # Contar total (cacheado por filtro)
+    total, total_mode = count_products_with_filters(session, filters, total_mode)
+
+    # Obtener productos paginados
+    result = session.execute(page_products_query(filters, page, size))
     products = result.scalars().all()
 
-    return products, total
+    return products, total, total_mode
+
+
+# =============================================
+# FACETAS
+# =============================================
+
+def facet_rows_query(filters: dict):
+    """Un solo GROUP BY (categoría, marca) con los filtros de precio.
+
+    Los filtros de categoría y marca se aplican después en memoria
+    (rollup_facets), así la misma pasada sirve para las dos facetas.
+    """
+    query = (
+        select(
+            Product.category_id,
+            Category.name.label("category_name"),
+            Product.brand_id,
+            Brand.name.label("brand_name"),
+            func.count().label("count"),
+        )
+        .outerjoin(Category, Product.category_id == Category.id)
+        .outerjoin(Brand, Product.brand_id == Brand.id)
+        .group_by(Product.category_id, Category.name, Product.brand_id, Brand.name)
+    )
+    price_filters = {"min_price": filters.get("min_price"), "max_price": filters.get("max_price")}
+    return apply_product_filters(query, price_filters)
+
+
+def facet_rows_key(filters: dict) -> tuple:
+    return normalize_filters(filters)[2:]
+
+
+def rollup_facets(rows, filters: dict, facets) -> dict:
+    """Suma los grupos por categoría y por marca.
+
+    Cada faceta respeta todos los filtros menos el suyo: los conteos de marca
+    usan las categorías elegidas y viceversa, para que el sidebar muestre
+    cuántos productos sumaría marcar otra opción.
+    """
+    category_ids, brand_ids = (None if ids is None else set(ids) for ids in normalize_filters(filters)[:2])
+    facet_columns = {
+        "categories": ("category_id", "category_name", "brand_id", brand_ids),
+        "brands": ("brand_id", "brand_name", "category_id", category_ids),
+    }
+    result = {}
+    for facet in facets:
+        id_column, name_column, other_column, other_ids = facet_columns[facet]
+        counts = {}
+        for row in rows:
+            if row[id_column] is None:
+                continue
+            if other_ids is not None and row[other_column] not in other_ids:
+                continue
+            key = (row[id_column], row[name_column])
+            counts[key] = counts.get(key, 0) + row["count"]
+        result[facet] = [
+            {"id": item_id, "name": name, "count": count}
+            for (item_id, name), count in sorted(counts.items(), key=lambda item: (-item[1], item[0][1]))
+        ]
+    return result
+
+
+def get_product_facets_db(session, filters: dict, facets) -> dict:
+    """Conteos por categoría y/o marca para los filtros (resueltos) del listado"""
+    def compute():
+        return [dict(row) for row in session.execute(facet_rows_query(filters)).mappings()]
+
+    rows = _facet_rows_cache.get_or_set(facet_rows_key(filters), compute)
+    return rollup_facets(rows, filters, facets)
+
+
+# =============================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# =============================================
+
+def encode_cursor(retail_price: float, product_id: int) -> str:
+    """Codifica la clave de orden (precio, id) en un cursor opaco"""
+    raw = json.dumps([retail_price, product_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """Decodifica un cursor generado por encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        retail_price, product_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(retail_price), int(product_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def cursor_products_query(filters: dict, size: int, cursor: str | None = None):
+    query = select(Product).options(*loader_options(Product, ProductOutSimple))
+    query = apply_product_filters(query, filters)
+
+    if cursor:
+        last_price, last_id = decode_cursor(cursor)
+        query = query.where(tuple_(Product.retail_price, Product.id) > tuple_(last_price, last_id))
+
+    # Pedir un elemento extra para saber si hay una página siguiente
+    return query.order_by(Product.retail_price, Product.id).limit(size + 1)
+
+
+def cursor_page(products, size: int):
+    """Recorta el elemento extra y calcula next_cursor"""
+    next_cursor = None
+    if len(products) > size:
+        products = products[:size]
+        last = products[-1]
+        next_cursor = encode_cursor(last.retail_price, last.id)
+    return products, next_cursor
+
+
+def fetch_products_with_cursor(session, size: int, filters: dict, cursor: str | None = None):
+    """Obtiene productos con filtros paginando por cursor (retail_price, id).
+
+    Cada página es un único rango sobre el índice, sin OFFSET ni COUNT,
+    por lo que el costo no depende de la profundidad de la página.
+    """
+    products = session.execute(cursor_products_query(filters, size, cursor)).scalars().all()
+    return cursor_page(products, size)
 
 
 def get_max_min_price_db(session):
-    """Obtiene precio máximo y mínimo"""
+    """Obtiene precio máximo y mínimo (del resumen en memoria, ver price_stats_s)"""
     try:
-        result = session.exec(
-            select(func.max(Product.retail_price), func.min(Product.retail_price))
-        ).one()
-        max_price, min_price = result
-        return max_price, min_price
+        return get_price_bounds_db(session)
     except Exception as e:
         session.rollback()
         raise e
 
 
 # =============================================
-# CRUD VARIANTES
+# LECTURAS ASYNC (ASYNC_DB=1)
 # =============================================
+# Mismas consultas que las versiones sync; las relaciones se cargan de forma
+# ansiosa, así que serializar el resultado no dispara consultas perezosas.
 
-def create_product_variant_db(product_variants, session):
-    """Crea variantes para un producto existente (falla si ya existe)"""
+async def get_product_by_id_db_async(session, product_id: int):
+    """Obtiene un producto por ID"""
     try:
-        db_variants = []
-        for variant in product_variants.variants:
-            # Validar existencia de producto
-            db_product = ensure_product_exists_id(variant.product_id, session)
-            
-            # Validar sucursal (es obligatoria)
-            ensure_branch_exists(variant.branch_id, session)
-
-            # Validar que NO exista (solo crear, no actualizar)
-            ensure_unique_constraints_product_variant(
-                variant.product_id,
-                variant.color,
-                variant.size,
-                variant.size_unit,
-                variant.unit,
-                session,
-            )
+        db_product = (await session.execute(product_by_id_query(product_id))).unique().scalar()
+        if not db_product:
+            raise ValueError(f"Producto con id {product_id} no existe")
+        return db_product
+    except Exception as e:
+        await session.rollback()
+        raise e
+
+
+async def estimate_count_async(session, query) -> int | None:
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    connection = await session.connection()
+    plan = (await connection.exec_driver_sql(*explain_statement(query, bind.dialect))).scalar()
+    return plan_rows(plan)
+
+
+async def count_products_with_filters_async(session, filters: dict, total_mode: str = "exact"):
+    """Cuenta productos filtrados; comparte la caché de totales con la versión sync"""
+    query = products_count_query(filters)
+
+    async def compute():
+        if total_mode == "estimate":
+            estimate = await estimate_count_async(session, query)
+            if estimate is not None:
+                return estimate, "estimate"
+        return (await session.execute(total_count_query(query))).scalar(), "exact"
+
+    return await _total_count_cache.get_or_set_async((normalize_filters(filters), total_mode), compute)
+
+
+async def fetch_products_with_filters_async(
+    session, page: int, size: int, filters: dict, total_mode: str = "exact"
+):
+    """Obtiene productos con filtros y paginación. Retorna (productos, total, modo_del_total)."""
+    total, total_mode = await count_products_with_filters_async(session, filters, total_mode)
+    result = await session.execute(page_products_query(filters, page, size))
+    return result.scalars().all(), total, total_mode
 
-            # Generar SKU
-            sku = generate_sku(
-                product_name=db_product.name,
-                category_id=db_product.category_id,
-                brand_id=db_product.brand_id,
+
+async def fetch_products_with_cursor_async(session, size: int, filters: dict, cursor: str | None = None):
+    """Obtiene productos con filtros paginando por cursor (retail_price, id)"""
+    result = await session.execute(cursor_products_query(filters, size, cursor))
+    return cursor_page(result.scalars().all(), size)
+
+
+async def get_product_facets_db_async(session, filters: dict, facets) -> dict:
+    """Conteos por categoría y/o marca; comparte la caché con la versión sync"""
+    async def compute():
+        return [dict(row) for row in (await session.execute(facet_rows_query(filters))).mappings()]
+
+    rows = await _facet_rows_cache.get_or_set_async(facet_rows_key(filters), compute)
+    return rollup_facets(rows, filters, facets)
+
+
+async def get_max_min_price_db_async(session):
+    """Obtiene precio máximo y mínimo (del resumen en memoria, ver price_stats_s)"""
+    try:
+        return await get_price_bounds_db_async(session)
+    except Exception as e:
+        await session.rollback()
+        raise e
+
+
+# =============================================
+# CRUD VARIANTES
+# =============================================
+
+def _variant_key(product_id, color, size, size_unit, unit):
+    """Clave de negocio de una variante (None se compara como valor)"""
+    return (product_id, color, size, size_unit, unit)
+
+
+def dialect_insert(session, table):
+    """INSERT del dialecto activo, con soporte de ON CONFLICT si existe"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy import insert
+    return insert(table)
+
+
+def bulk_write_variants_db(variants, session, upsert: bool, commit: bool = True):
+    """Crea (o actualiza si upsert) muchas variantes en una sola transacción.
+
+    Valida productos y sucursales con una consulta cada uno, trae las
+    variantes existentes de esos productos de una vez, actualiza las
+    coincidencias con un único UPDATE e inserta las nuevas con un INSERT
+    multi-fila (ON CONFLICT DO UPDATE en upsert). Las imágenes se
+    reemplazan con un DELETE y un INSERT multi-fila. Un solo commit; con
+    commit=False la transacción (y la invalidación) quedan a cargo del llamador.
+    """
+    if not variants:
+        return []
+
+    product_ids = {variant.product_id for variant in variants}
+    products = {
+        product.id: product
+        for product in session.execute(select(Product).where(Product.id.in_(product_ids))).scalars()
+    }
+    missing_products = product_ids - set(products)
+    if missing_products:
+        raise ValueError(f"Producto con id {min(missing_products)} no existe")
+    ensure_branches_exist({variant.branch_id for variant in variants}, session)
+
+    table = ProductVariant.__table__
+    existing = {
+        _variant_key(row.product_id, row.color, row.size, row.size_unit, row.unit): row.id
+        for row in session.execute(
+            select(table.c.id, table.c.product_id, table.c.color, table.c.size, table.c.size_unit, table.c.unit)
+            .where(table.c.product_id.in_(product_ids))
+        )
+    }
+
+    # Separar actualizaciones de inserciones; en upsert gana la última repetida
+    keys = []
+    to_update: dict[int, object] = {}
+    to_insert: dict[tuple, object] = {}
+    for variant in variants:
+        key = _variant_key(variant.product_id, variant.color, variant.size, variant.size_unit, variant.unit)
+        keys.append(key)
+        if key in existing:
+            if not upsert:
+                raise ValueError("Ya existe una variante con las mismas características de color, tamaño y unidad.")
+            to_update[existing[key]] = variant
+        else:
+            if not upsert and key[:4] in to_insert:
+                raise ValueError("La solicitud incluye variantes repetidas.")
+            to_insert[key[:4]] = variant
+
+    if to_update:
+        session.execute(
+            update(table)
+            .where(table.c.id.in_(list(to_update)))
+            .values(
+                branch_id=case({vid: v.branch_id for vid, v in to_update.items()}, value=table.c.id),
+                stock=case({vid: v.stock for vid, v in to_update.items()}, value=table.c.id),
+                min_stock=case({vid: v.min_stock for vid, v in to_update.items()}, value=table.c.id),
             )
+        )
 
-            # Crear variante nueva
-            db_variant = ProductVariant(
-                product_id=variant.product_id,
-                sku=sku,
-                color=variant.color,
-                size=variant.size,
-                size_unit=variant.size_unit,
-                unit=variant.unit,
-                branch_id=variant.branch_id,
-                stock=variant.stock,
-                min_stock=variant.min_stock,
+    variant_ids: dict[tuple, int] = {}
+    if to_insert:
+        rows = []
+        for variant in to_insert.values():
+            product = products[variant.product_id]
+            rows.append({
+                "product_id": variant.product_id,
+                "sku": generate_sku(product.name, product.category_id, product.brand_id),
+                "color": variant.color,
+                "size": variant.size,
+                "size_unit": variant.size_unit,
+                "unit": variant.unit,
+                "branch_id": variant.branch_id,
+                "stock": variant.stock,
+                "min_stock": variant.min_stock,
+                "created_at": datetime.now(),
+                "updated_at": datetime.now(),
+            })
+        statement = dialect_insert(session, table).values(rows)
+        if upsert and hasattr(statement, "on_conflict_do_update"):
+            # Red de seguridad ante escrituras concurrentes del mismo (producto, color, talla)
+            statement = statement.on_conflict_do_update(
+                index_elements=["product_id", "color", "size", "size_unit"],
+                set_={
+                    "branch_id": statement.excluded.branch_id,
+                    "stock": statement.excluded.stock,
+                    "min_stock": statement.excluded.min_stock,
+                    "updated_at": statement.excluded.updated_at,
+                },
             )
-            session.add(db_variant)
-            session.commit()
-            session.refresh(db_variant)
+        statement = statement.returning(
+            table.c.id, table.c.product_id, table.c.color, table.c.size, table.c.size_unit
+        )
+        for row in session.execute(statement):
+            variant_ids[(row.product_id, row.color, row.size, row.size_unit)] = row.id
+
+    # Id de cada variante de la solicitud, en el mismo orden
+    ids = [existing[key] if key in existing else variant_ids[key[:4]] for key in keys]
+    written = {vid: to_update.get(vid) or to_insert[key[:4]] for vid, key in zip(ids, keys)}
+
+    # Imágenes: en upsert una lista (aunque sea vacía) reemplaza las anteriores
+    if upsert:
+        replaced = [vid for vid, variant in written.items() if variant.images is not None]
+        if replaced:
+            session.execute(delete(ProductImage.__table__).where(ProductImage.__table__.c.variant_id.in_(replaced)))
+    images = [
+        {"variant_id": vid, "image_url": str(url), "created_at": datetime.now()}
+        for vid, variant in written.items()
+        for url in (variant.images or [])
+        if url and url.strip()
+    ]
+    if images:
+        session.execute(insert(ProductImage.__table__), images)
+
+    if commit:
+        session.commit()
+        invalidate_products(product_ids)
 
-            # Agregar imágenes si existen
-            if variant.images:
-                persist_product_images(variant.images, db_variant.id, session)
-            
-            db_variants.append(db_variant)
+    loaded = {
+        variant.id: variant
+        for variant in session.execute(select(ProductVariant).where(ProductVariant.id.in_(ids))).scalars()
+    }
+    return [loaded[vid] for vid in ids]
 
-        return db_variants
+
+def create_product_variant_db(product_variants, session):
+    """Crea variantes para un producto existente (falla si ya existe)"""
+    try:
+        return bulk_write_variants_db(product_variants.variants, session, upsert=False)
 
     except ValueError as e:
         session.rollback()
@@ -344,77 +831,7 @@ def create_product_variant_db(product_variants, session):
 def upsert_product_variant_db(product_variants, session):
     """Crea o actualiza variantes (upsert) - Si existe, actualiza; si no, crea"""
     try:
-        db_variants = []
-        for variant in product_variants.variants:
-            # Validar existencia de producto
-            db_product = ensure_product_exists_id(variant.product_id, session)
-            
-            # Validar sucursal (es obligatoria)
-            ensure_branch_exists(variant.branch_id, session)
-
-            # Buscar si ya existe una variante con las mismas características
-            existing_variant = find_existing_variant(
-                variant.product_id,
-                variant.color,
-                variant.size,
-                variant.size_unit,
-                variant.unit,
-                session,
-            )
-
-            if existing_variant:
-                # ACTUALIZAR variante existente
-                existing_variant.branch_id = variant.branch_id
-                existing_variant.stock = variant.stock
-                existing_variant.min_stock = variant.min_stock
-                session.commit()
-                session.refresh(existing_variant)
-                
-                # Reemplazar imágenes si se proporcionan
-                if variant.images is not None:
-                    # Eliminar imágenes antiguas
-                    old_images = session.exec(
-                        select(ProductImage).where(ProductImage.variant_id == existing_variant.id)
-                    ).all()
-                    for img in old_images:
-                        session.delete(img)
-                    session.commit()
-                    
-                    # Agregar nuevas imágenes
-                    if variant.images:  # Solo si la lista no está vacía
-                        persist_product_images(variant.images, existing_variant.id, session)
-                
-                db_variants.append(existing_variant)
-            else:
-                # CREAR variante nueva
-                sku = generate_sku(
-                    product_name=db_product.name,
-                    category_id=db_product.category_id,
-                    brand_id=db_product.brand_id,
-                )
-
-                db_variant = ProductVariant(
-                    product_id=variant.product_id,
-                    sku=sku,
-                    color=variant.color,
-                    size=variant.size,
-                    size_unit=variant.size_unit,
-                    unit=variant.unit,
-                    branch_id=variant.branch_id,
-                    stock=variant.stock,
-                    min_stock=variant.min_stock,
-                )
-                session.add(db_variant)
-                session.commit()
-                session.refresh(db_variant)
-
-                # Agregar imágenes si existen
-                if variant.images:
-                    persist_product_images(variant.images, db_variant.id, session)
-                
-                db_variants.append(db_variant)
-
-        return db_variants
+        return bulk_write_variants_db(product_variants.variants, session, upsert=True)
 
     except ValueError as e:
         session.rollback()
@@ -432,8 +849,10 @@ def get_product_variants_by_product_id_db(product_id: int, session):
     """Obtiene variantes por ID de producto"""
     try:
         db_variants = session.exec(
-            select(ProductVariant).where(ProductVariant.product_id == product_id)
-        ).all()
+            select(ProductVariant)
+            .where(ProductVariant.product_id == product_id)
+            .options(*loader_options(ProductVariant, ProductVariantOut))
+        ).scalars().all()
         return db_variants
     except Exception as e:
         session.rollback()
@@ -463,6 +882,7 @@ def update_product_variant_db(variant_id: int, variant: ProductVariantUpdate, se
         
         session.commit()
         session.refresh(db_variant)
+        invalidate("product", db_variant.product_id)
         return db_variant
     except Exception as e:
         session.rollback()
@@ -473,8 +893,10 @@ def delete_product_variant_db(variant_id: int, session):
     """Elimina una variante"""
     try:
         db_variant = ensure_product_variant_exists(variant_id, session)
+        product_id = db_variant.product_id
         session.delete(db_variant)
         session.commit()
+        invalidate("product", product_id)
         return {"msg": "Variante eliminada correctamente"}
     except Exception as e:
         session.rollback()
@@ -499,27 +921,77 @@ def persist_product_images(images: List[str], variant_id: int, session):
         raise e
 
 
-def add_stock_product_variant(variant_id: int, quantity: int, session):
-    """Añade stock a una variante"""
+def _apply_stock_delta(variant_id: int, delta: int, session) -> int:
+    """Suma delta al stock en un único UPDATE condicional.
+
+    La condición stock + delta >= 0 se evalúa en la base de datos, así dos
+    ventas concurrentes no pueden pisarse ni dejar stock negativo.
+    """
+    variants = ProductVariant.__table__
+    row = session.execute(
+        update(variants)
+        .where(variants.c.id == variant_id)
+        .where(variants.c.stock + delta >= 0)
+        .values(stock=variants.c.stock + delta)
+        .returning(variants.c.product_id, variants.c.stock)
+    ).first()
+    if row is None:
+        # Solo en el camino de error: distinguir inexistente de sin stock
+        ensure_product_variant_exists(variant_id, session)
+        raise ValueError("No hay suficiente stock")
+    session.commit()
+    invalidate("product", row.product_id)
+    return row.stock
+
+
+def add_stock_product_variant(variant_id: int, quantity: int, session) -> int:
+    """Añade stock a una variante y retorna el stock resultante"""
     try:
-        db_variant = ensure_product_variant_exists(variant_id, session)
-        db_variant.stock += quantity
-        session.commit()
-        return db_variant
+        return _apply_stock_delta(variant_id, quantity, session)
     except Exception as e:
         session.rollback()
         raise e
 
 
-def reduce_stock_product_variant(variant_id: int, quantity: int, session):
-    """Reduce stock de una variante"""
+def reduce_stock_product_variant(variant_id: int, quantity: int, session) -> int:
+    """Reduce stock de una variante y retorna el stock resultante"""
     try:
-        db_variant = ensure_product_variant_exists(variant_id, session)
-        if db_variant.stock < quantity:
-            raise ValueError("No hay suficiente stock")
-        db_variant.stock -= quantity
+        return _apply_stock_delta(variant_id, -quantity, session)
+    except Exception as e:
+        session.rollback()
+        raise e
+
+
+def adjust_stock_batch_db(adjustments, session) -> dict[int, int]:
+    """Aplica muchos pares (variant_id, delta) en una sola sentencia.
+
+    Es todo o nada: si alguna variante no existe o quedaría con stock
+    negativo no se aplica ningún cambio. Retorna {variant_id: stock}.
+    """
+    try:
+        deltas: dict[int, int] = {}
+        for variant_id, delta in adjustments:
+            deltas[variant_id] = deltas.get(variant_id, 0) + delta
+        if not deltas:
+            return {}
+
+        variants = ProductVariant.__table__
+        delta_expr = case(deltas, value=variants.c.id, else_=0)
+        rows = session.execute(
+            update(variants)
+            .where(variants.c.id.in_(list(deltas)))
+            .where(variants.c.stock + delta_expr >= 0)
+            .values(stock=variants.c.stock + delta_expr)
+            .returning(variants.c.id, variants.c.product_id, variants.c.stock)
+        ).all()
+
+        if len(rows) != len(deltas):
+            failed = sorted(set(deltas) - {row.id for row in rows})
+            raise ValueError(f"Stock insuficiente o variante inexistente: {failed}")
+
         session.commit()
-        return db_variant
+        invalidate_products(row.product_id for row in rows)
+        return {row.id: row.stock for row in rows}
     except Exception as e:
         session.rollback()
         raise e
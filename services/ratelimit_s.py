@@ -0,0 +1,102 @@
+"""
+Límite de intentos de login (token bucket por IP y por identificador)
+
+Cada clave tiene un balde de `burst` fichas que se recarga a `per_minute`
+fichas por minuto; cada intento consume una. Los baldes viven en memoria con
+descarte LRU, así que un ataque con muchas claves distintas no hace crecer
+el proceso. Con varias réplicas se puede registrar un backend compartido con
+set_backend() (por ejemplo Redis), que solo necesita implementar take().
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Intentos por minuto y ráfaga máxima; per_minute=0 desactiva el límite
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IDENTIFIER_PER_MINUTE = float(os.getenv("LOGIN_IDENTIFIER_PER_MINUTE", "5"))
+LOGIN_IDENTIFIER_BURST = int(os.getenv("LOGIN_IDENTIFIER_BURST", "5"))
+LOGIN_RATE_LIMIT_MAX_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_KEYS", "10000"))
+# Proxies propios delante de la app (Railway: 1). Con 0 la IP es la de la
+# conexión; detrás de un proxy esa es la del proxy y todos compartirían balde
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+class MemoryBuckets:
+    """Baldes en memoria, thread-safe, con descarte LRU al superar maxsize"""
+
+    def __init__(self, maxsize: int = LOGIN_RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        # clave -> (fichas, instante de la última recarga)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, per_minute: float, burst: int) -> float:
+        """Consume una ficha; retorna 0 si se permitió o los segundos a esperar"""
+        now = time.monotonic()
+        rate = per_minute / 60
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+_backend = MemoryBuckets()
+
+
+def set_backend(backend):
+    """Reemplaza los baldes en memoria por un backend con take(key, per_minute, burst) y reset(key)"""
+    global _backend
+    _backend = backend
+
+
+def client_ip(peer: str | None, forwarded_for: str | None, hops: int = TRUSTED_PROXY_HOPS) -> str | None:
+    """IP del cliente para el límite por IP.
+
+    Cada proxy agrega a X-Forwarded-For la dirección de quien le habló, así
+    que con `hops` proxies propios la IP real es la entrada número `hops`
+    contando desde la derecha; lo que está más a la izquierda lo escribió el
+    cliente y no es confiable. Sin la cabecera esperada se usa la conexión.
+    """
+    if hops <= 0 or not forwarded_for:
+        return peer
+    addresses = [address.strip() for address in forwarded_for.split(",") if address.strip()]
+    if len(addresses) < hops:
+        return peer
+    return addresses[-hops]
+
+
+def check_login_ip(ip: str | None) -> float:
+    """Consume un intento de la IP; retorna los segundos a esperar (0 = permitido)"""
+    if not ip or LOGIN_IP_PER_MINUTE <= 0:
+        return 0.0
+    return _backend.take(f"ip:{ip}", LOGIN_IP_PER_MINUTE, LOGIN_IP_BURST)
+
+
+def check_login_identifier(identifier: str) -> float:
+    """Consume un intento del usuario/email; retorna los segundos a esperar (0 = permitido)"""
+    if LOGIN_IDENTIFIER_PER_MINUTE <= 0:
+        return 0.0
+    return _backend.take(f"id:{identifier.strip().lower()}", LOGIN_IDENTIFIER_PER_MINUTE, LOGIN_IDENTIFIER_BURST)
+
+
+def reset_login_identifier(identifier: str):
+    """Restituye el balde del identificador tras un login correcto"""
+    _backend.reset(f"id:{identifier.strip().lower()}")
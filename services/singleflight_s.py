@@ -0,0 +1,67 @@
+"""
+Single-flight: una sola ejecución a la vez por clave
+
+Si llegan varias llamadas con la misma clave mientras la primera todavía está
+calculando, las demás esperan y reciben el mismo resultado (o la misma
+excepción) en lugar de repetir el trabajo. Hay una variante para hilos (rutas
+sync en el threadpool) y otra para corrutinas (handlers async y middleware).
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self._futures: dict = {}
+
+    def do(self, key, fn):
+        """Ejecuta fn() o espera a la ejecución en curso con la misma clave"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, factory):
+        """Como do(), pero factory() es una corrutina.
+
+        El cálculo corre en su propia tarea: si el primer cliente cancela su
+        petición, los que esperan siguen recibiendo el resultado.
+        """
+        key = (id(asyncio.get_running_loop()), key)
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._futures[key] = future
+            future.add_done_callback(lambda _: self._futures.pop(key, None))
+        return await asyncio.shield(future)
+
+    def __len__(self):
+        return len(self._calls) + len(self._futures)